@@ -1,84 +1,91 @@
 import logging
-from helper import llm, system_prompt
-from tools.nutrition_rag import build_nutrition_rag
-
-# Initialize RAG tool
-nutrition_tool = build_nutrition_rag()
+from helper import system_prompt
+from resources import get_llm, get_nutrition_tool
+from router import match_categories
+from context_packer import pack_for_endpoint
 
 # ----------------------------
 # Helpers specific to nutrition
 # ----------------------------
-NUTRITION_KEYWORDS = [
-    "nutrition", "diet", "food", "nutrient", "protein", "carbohydrate", "fat",
-    "vitamin", "mineral", "fiber", "hydration", "balanced diet", "healthy eating",
-    "meal plan", "micronutrients", "macronutrients", "sodium", "cholesterol",
-    "sugar", "vegetables", "fruits", "whole grains", "dietary guideline"
-]
-
 def extract_nutrition_keywords(query: str) -> str:
-    return " ".join([kw for kw in NUTRITION_KEYWORDS if kw.lower() in query.lower()])
+    return " ".join(match_categories(query).get("nutrition", []))
 
 def is_nutrition_query(query: str) -> bool:
     return bool(extract_nutrition_keywords(query))
 
 # ----------------------------
-# Main Nutrition response function (RAG + LLM)
+# Prompt construction shared by the blocking and streaming paths
 # ----------------------------
-def get_nutrition_response(user_input: str, language="English") -> str:
-    try:
-        # Language instruction
-        language_prompts = {
-            "English": "Respond in English.",
-            "Spanish": "Responde en español.",
-            "French": "Veuillez répondre en français.",
-            "Deutsch": "Bitte antworte auf Deutsch."
-        }
-        lang_instruction = language_prompts.get(language, "Respond in English.")
-        
-        full_prompt = f"{system_prompt}\n{lang_instruction}\nUser: {user_input}\n"
+def build_nutrition_prompts(user_input: str, language="English"):
+    """
+    Return (full_prompt, fallback_prompt) for a nutrition question, with RAG context if available.
+    """
+    # Language instruction
+    language_prompts = {
+        "English": "Respond in English.",
+        "Spanish": "Responde en español.",
+        "French": "Veuillez répondre en français.",
+        "Deutsch": "Bitte antworte auf Deutsch."
+    }
+    lang_instruction = language_prompts.get(language, "Respond in English.")
 
-        # ----------------------------
-        # Nutrition RAG context
-        # ----------------------------
-        rag_context = ""
-        if nutrition_tool and is_nutrition_query(user_input):
-            logging.info("Routing query to Nutrition RAG...")
-            keywords = extract_nutrition_keywords(user_input)
-            rag_response = nutrition_tool.run(keywords)
-            if rag_response.strip():
-                rag_context = (
-                    f"Nutrition Reference (keywords: {keywords}):\n{rag_response}\n"
-                    "Use only this context for your answer.\n"
-                )
+    full_prompt = f"{system_prompt}\n{lang_instruction}\nUser: {user_input}\n"
+    fallback_prompt = f"{system_prompt}\n{lang_instruction}\nUser: {user_input}"
 
-        # ----------------------------
-        # Add context to prompt
-        # ----------------------------
-        if rag_context:
-            full_prompt += (
-                "Use the following evidence to support your response:\n"
-                f"{rag_context}"
-                "\nIMPORTANT: Answer using only the provided context. "
-                "Do NOT provide information outside of the retrieved references unless necessary.\n"
-            )
-        else:
-            full_prompt += (
-                "Note: No relevant document found in RAG. "
-                "You may answer using general knowledge, but clearly state this.\n"
+    # ----------------------------
+    # Nutrition RAG context
+    # ----------------------------
+    rag_context = ""
+    # Shared RAG tool; skipped (not waited on) while it is still warming up
+    nutrition_tool = get_nutrition_tool(wait=False)
+    keywords = extract_nutrition_keywords(user_input) if nutrition_tool else ""
+    if keywords:
+        logging.info("Routing query to Nutrition RAG...")
+        rag_response = nutrition_tool.run(keywords)
+        if rag_response.strip():
+            # Keep only the most relevant sentences within the endpoint's token budget
+            packed = pack_for_endpoint("nutrition", f"{user_input} {keywords}", rag_response)
+            rag_context = (
+                f"Nutrition Reference (keywords: {keywords}):\n{packed.text}\n"
+                "Use only this context for your answer.\n"
             )
 
+    # ----------------------------
+    # Add context to prompt
+    # ----------------------------
+    if rag_context:
+        full_prompt += (
+            "Use the following evidence to support your response:\n"
+            f"{rag_context}"
+            "\nIMPORTANT: Answer using only the provided context. "
+            "Do NOT provide information outside of the retrieved references unless necessary.\n"
+        )
+    else:
+        full_prompt += (
+            "Note: No relevant document found in RAG. "
+            "You may answer using general knowledge, but clearly state this.\n"
+        )
+
+    return full_prompt, fallback_prompt
+
+# ----------------------------
+# Main Nutrition response function (RAG + LLM)
+# ----------------------------
+def get_nutrition_response(user_input: str, language="English") -> str:
+    try:
+        full_prompt, fallback_prompt = build_nutrition_prompts(user_input, language)
+
         # ----------------------------
         # Generate answer with IBM Granite LLM
         # ----------------------------
         logging.info("Generating response with IBM Granite LLM...")
-        result = llm.generate([full_prompt])
+        result = get_llm().generate([full_prompt])
         answer = result.generations[0][0].text.strip()
 
         # Fallback if empty
         if not answer:
             logging.warning("LLM returned empty response. Using fallback prompt...")
-            fallback_prompt = f"{system_prompt}\n{lang_instruction}\nUser: {user_input}"
-            result = llm.generate([fallback_prompt])
+            result = get_llm().generate([fallback_prompt])
             answer = result.generations[0][0].text.strip()
 
         return f"Assistant: {answer}"
@@ -86,3 +93,30 @@ def get_nutrition_response(user_input: str, language="English") -> str:
     except Exception as e:
         logging.error(f"Error during Nutrition response: {e}")
         return "Assistant: Sorry, something went wrong. Please try again later."
+
+# ----------------------------
+# Streaming variant: yields tokens as Watsonx produces them
+# ----------------------------
+def stream_nutrition_response(user_input: str, language="English"):
+    produced = False
+    try:
+        full_prompt, fallback_prompt = build_nutrition_prompts(user_input, language)
+
+        logging.info("Streaming response from IBM Granite LLM...")
+        for chunk in get_llm().stream(full_prompt):
+            if chunk:
+                produced = produced or bool(chunk.strip())
+                yield chunk
+
+        # Fallback if empty
+        if not produced:
+            logging.warning("LLM streamed an empty response. Using fallback prompt...")
+            for chunk in get_llm().stream(fallback_prompt):
+                if chunk:
+                    produced = True
+                    yield chunk
+
+    except Exception as e:
+        logging.error(f"Error during streamed Nutrition response: {e}")
+        if not produced:
+            yield "Sorry, something went wrong. Please try again later."
@@ -1,80 +1,87 @@
 # agents/physical_activity_agent.py
 import logging
-from helper import llm, system_prompt
-from tools.physical_activity_rag import build_physical_activity_rag
-
-# Initialize RAG tool
-physical_activity_tool = build_physical_activity_rag()
+from helper import system_prompt
+from resources import get_llm, get_physical_activity_tool
+from router import match_categories
+from context_packer import pack_for_endpoint
 
 # ----------------------------
 # Helpers specific to physical activity
 # ----------------------------
 def extract_physical_keywords(query: str) -> str:
-    physical_keywords = [
-        "exercise", "physical activity", "fitness", "workout", "aerobic",
-        "strength", "endurance", "cardio", "movement", "sports", "training",
-        "walking", "running", "yoga", "stretching", "cycling", "swimming", "resistance"
-    ]
-    keywords_found = [kw for kw in physical_keywords if kw.lower() in query.lower()]
-    return " ".join(keywords_found)
+    return " ".join(match_categories(query).get("physical_activity", []))
 
 def is_physical_activity_query(query: str) -> bool:
     return bool(extract_physical_keywords(query))
 
+# ----------------------------
+# Prompt construction shared by the blocking and streaming paths
+# ----------------------------
+def build_physical_activity_prompts(user_input: str, language="English"):
+    """
+    Return (full_prompt, fallback_prompt) for a physical activity question, with RAG context if available.
+    """
+    language_prompts = {
+        "English": "Respond in English.",
+        "Spanish": "Responde en español.",
+        "French": "Veuillez répondre en français.",
+        "Deutsch": "Bitte antworte auf Deutsch."
+    }
+    lang_instruction = language_prompts.get(language, "Please respond in English.")
+
+    full_prompt = f"{system_prompt}\n{lang_instruction}\nUser: {user_input}\n"
+    fallback_prompt = f"{system_prompt}\n{lang_instruction}\nUser: {user_input}"
+
+    # Physical Activity RAG (keyword-based)
+    rag_context = ""
+    # Shared RAG tool; skipped (not waited on) while it is still warming up
+    physical_activity_tool = get_physical_activity_tool(wait=False)
+    keywords_for_rag = extract_physical_keywords(user_input) if physical_activity_tool else ""
+    if keywords_for_rag:
+        logging.info("Fetching Physical Activity info from RAG...")
+        rag_response = physical_activity_tool.run(keywords_for_rag)
+        if rag_response.strip():
+            # Keep only the most relevant sentences within the endpoint's token budget
+            packed = pack_for_endpoint("physical_activity", f"{user_input} {keywords_for_rag}", rag_response)
+            rag_context = (
+                f"Physical Activity Reference (keywords: {keywords_for_rag}):\n"
+                f"{packed.text}\n"
+                "Reference each piece of info from the retrieved document.\n"
+            )
+
+    # Combine context
+    if rag_context:
+        context_text = "Use the following evidence to support your response:\n"
+        context_text += rag_context
+        context_text += (
+            "\nIMPORTANT: Answer using only the provided context. "
+            "Do NOT provide information outside of the retrieved references unless necessary.\n"
+        )
+        full_prompt += context_text
+    else:
+        full_prompt += (
+            "Note: No relevant document found in RAG. "
+            "You may answer using your general knowledge, but clearly state this.\n"
+        )
+
+    return full_prompt, fallback_prompt
+
 # ----------------------------
 # Main Physical Activity response function (RAG-only)
 # ----------------------------
 def get_physical_activity_response(user_input: str, language="English") -> str:
     try:
-        language_prompts = {
-            "English": "Respond in English.",
-            "Spanish": "Responde en español.",
-            "French": "Veuillez répondre en français.",
-            "Deutsch": "Bitte antworte auf Deutsch."
-        }
-        lang_instruction = language_prompts.get(language, "Please respond in English.")
-
-        full_prompt = f"{system_prompt}\n{lang_instruction}\nUser: {user_input}\n"
-
-        # Physical Activity RAG (keyword-based)
-        rag_context = ""
-        if physical_activity_tool and is_physical_activity_query(user_input):
-            logging.info("Fetching Physical Activity info from RAG...")
-            keywords_for_rag = extract_physical_keywords(user_input)
-            if keywords_for_rag:
-                rag_response = physical_activity_tool.run(keywords_for_rag)
-                if rag_response.strip():
-                    rag_context = (
-                        f"Physical Activity Reference (keywords: {keywords_for_rag}):\n"
-                        f"{rag_response}\n"
-                        "Reference each piece of info from the retrieved document.\n"
-                    )
-
-        # Combine context
-        if rag_context:
-            context_text = "Use the following evidence to support your response:\n"
-            context_text += rag_context
-            context_text += (
-                "\nIMPORTANT: Answer using only the provided context. "
-                "Do NOT provide information outside of the retrieved references unless necessary.\n"
-            )
-            full_prompt += context_text
-        else:
-            full_prompt += (
-                "Note: No relevant document found in RAG. "
-                "You may answer using your general knowledge, but clearly state this.\n"
-            )
+        full_prompt, fallback_prompt = build_physical_activity_prompts(user_input, language)
 
         # Generate answer with IBM Granite LLM
         logging.info("Generating response with IBM Granite LLM...")
-        result = llm.generate([full_prompt])
+        result = get_llm().generate([full_prompt])
         answer = result.generations[0][0].text
 
         # Fallback safety
         if not answer.strip():
             logging.warning("LLM returned empty response, generating fallback answer...")
-            fallback_prompt = f"{system_prompt}\n{lang_instruction}\nUser: {user_input}"
-            result = llm.generate([fallback_prompt])
+            result = get_llm().generate([fallback_prompt])
             answer = result.generations[0][0].text
 
         return f"Assistant: {answer}"
@@ -82,3 +89,30 @@ def get_physical_activity_response(user_input: str, language="English") -> str:
     except Exception as e:
         logging.error(f"Error during Physical Activity response: {e}")
         return "Assistant: Sorry, something went wrong. Please try again later."
+
+# ----------------------------
+# Streaming variant: yields tokens as Watsonx produces them
+# ----------------------------
+def stream_physical_activity_response(user_input: str, language="English"):
+    produced = False
+    try:
+        full_prompt, fallback_prompt = build_physical_activity_prompts(user_input, language)
+
+        logging.info("Streaming response from IBM Granite LLM...")
+        for chunk in get_llm().stream(full_prompt):
+            if chunk:
+                produced = produced or bool(chunk.strip())
+                yield chunk
+
+        # Fallback safety
+        if not produced:
+            logging.warning("LLM streamed an empty response, generating fallback answer...")
+            for chunk in get_llm().stream(fallback_prompt):
+                if chunk:
+                    produced = True
+                    yield chunk
+
+    except Exception as e:
+        logging.error(f"Error during streamed Physical Activity response: {e}")
+        if not produced:
+            yield "Sorry, something went wrong. Please try again later."
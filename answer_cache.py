@@ -0,0 +1,181 @@
+# answer_cache.py
+import os
+import re
+import time
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+# ----------------------------
+# Configuration
+# ----------------------------
+this_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "ANSWER_CACHE_PATH",
+    os.path.join(this_dir, "data", "answer_cache.sqlite3")
+)
+DEFAULT_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL", 24 * 60 * 60))
+DEFAULT_MEMORY_ENTRIES = int(os.getenv("ANSWER_CACHE_MEMORY_ENTRIES", 256))
+DEFAULT_DISK_ENTRIES = int(os.getenv("ANSWER_CACHE_DISK_ENTRIES", 5000))
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a user question so trivially different spellings share a cache entry.
+    Lowercases, collapses whitespace and drops trailing punctuation.
+    """
+    query = re.sub(r"\s+", " ", (query or "").strip().lower())
+    return query.rstrip("?!. ")
+
+
+class AnswerCache:
+    """
+    Two-tier answer cache: an in-process LRU in front of a SQLite table.
+    Entries are keyed on (normalized query, language, route) and expire after `ttl` seconds.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL_SECONDS,
+                 memory_entries=DEFAULT_MEMORY_ENTRIES, disk_entries=DEFAULT_DISK_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        self._conn = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS answers (
+                    key TEXT PRIMARY KEY,
+                    answer TEXT,
+                    created_at REAL,
+                    accessed_at REAL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_accessed ON answers (accessed_at)")
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"Answer cache disk tier disabled ({path}): {e}")
+            self._conn = None
+
+    # ----------------------------
+    # Keys
+    # ----------------------------
+    @staticmethod
+    def make_key(query: str, language: str, route: str) -> str:
+        payload = json.dumps([normalize_query(query), language or "", route or ""])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # ----------------------------
+    # Lookup / store
+    # ----------------------------
+    def get(self, query: str, language: str, route: str):
+        """Return a cached answer or None."""
+        key = self.make_key(query, language, route)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                answer, created_at = entry
+                if now - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return answer
+                del self._memory[key]
+
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute(
+                        "SELECT answer, created_at FROM answers WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row and now - row[1] <= self.ttl:
+                        self._conn.execute("UPDATE answers SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._conn.commit()
+                        self._remember(key, row[0], row[1])
+                        self._stats["disk_hits"] += 1
+                        return row[0]
+                    if row:
+                        self._conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                        self._conn.commit()
+                except sqlite3.Error as e:
+                    logging.warning(f"Answer cache read failed: {e}")
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, query: str, language: str, route: str, answer: str) -> None:
+        """Store an answer in both tiers."""
+        key = self.make_key(query, language, route)
+        now = time.time()
+
+        with self._lock:
+            self._remember(key, answer, now)
+            self._stats["stores"] += 1
+
+            if self._conn is not None:
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO answers (key, answer, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                        (key, answer, now, now)
+                    )
+                    self._evict_disk(now)
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    logging.warning(f"Answer cache write failed: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM answers")
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        """Hit/miss counters plus current tier sizes."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_size"] = len(self._memory)
+            stats["disk_size"] = 0
+            if self._conn is not None:
+                try:
+                    stats["disk_size"] = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    # ----------------------------
+    # Internals (caller holds the lock)
+    # ----------------------------
+    def _remember(self, key, answer, created_at):
+        self._memory[key] = (answer, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _evict_disk(self, now):
+        self._conn.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl,))
+        count = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        overflow = count - self.disk_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,)
+            )
+            self._stats["evictions"] += overflow
+
+
+# Shared instance used by main.get_response
+answer_cache = AnswerCache()
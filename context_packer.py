@@ -0,0 +1,119 @@
+# context_packer.py
+import os
+import re
+import math
+import logging
+import threading
+from typing import NamedTuple
+from tools.hybrid_retrieval import tokenize
+
+# ----------------------------
+# Configuration
+# ----------------------------
+# Token budget for retrieved context, per prompt-building endpoint
+CONTEXT_TOKEN_BUDGETS = {
+    "nutrition": int(os.getenv("NUTRITION_CONTEXT_TOKENS", 600)),
+    "physical_activity": int(os.getenv("PHYSICAL_ACTIVITY_CONTEXT_TOKENS", 800)),
+}
+DEFAULT_CONTEXT_TOKENS = int(os.getenv("DEFAULT_CONTEXT_TOKENS", 600))
+
+# Granite's tokenizer averages roughly four characters per token on English text;
+# counting locally avoids a tokenize round-trip to Watsonx on every prompt.
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+(?=\s*(?:[•\-–*]|\d+\.)\s)|\n{2,}")
+
+
+def count_tokens(text: str) -> int:
+    """Approximate Granite token count of a text."""
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+class PackedContext(NamedTuple):
+    text: str
+    tokens: int
+    trimmed_tokens: int
+    sentences_kept: int
+    sentences_total: int
+
+
+_stats = {"calls": 0, "tokens_in": 0, "tokens_out": 0, "trimmed_tokens": 0}
+_stats_lock = threading.Lock()
+
+
+def _sentences(context: str) -> list:
+    """(chunk position, sentence) pairs; chunks are the "\\n\\n"-joined retrieval results."""
+    sentences = []
+    for chunk_position, chunk in enumerate(context.split("\n\n")):
+        for sentence in _SENTENCE_SPLIT.split(chunk):
+            sentence = " ".join(sentence.split())
+            if sentence:
+                sentences.append((chunk_position, sentence))
+    return sentences
+
+
+def pack_context(query: str, context: str, budget_tokens: int) -> PackedContext:
+    """
+    Fit retrieved context into a token budget. Sentences are ranked by how many
+    query terms they cover (ties go to higher-ranked chunks), the best are kept until
+    the budget is full, and the survivors are put back in document order with "…"
+    marking the gaps. Context that already fits is returned unchanged.
+    """
+    total = count_tokens(context)
+    sentences = _sentences(context)
+    if total <= budget_tokens:
+        return _record(PackedContext(context, total, 0, len(sentences), len(sentences)), total)
+
+    query_terms = set(tokenize(query))
+
+    def score(item):
+        position, (chunk_position, sentence) = item
+        terms = set(tokenize(sentence))
+        coverage = len(query_terms & terms)
+        return (coverage / math.sqrt(len(terms) or 1), -chunk_position, -position)
+
+    kept, used = set(), 0
+    for position, (_, sentence) in sorted(enumerate(sentences), key=score, reverse=True):
+        cost = count_tokens(sentence) + 1
+        if used + cost > budget_tokens:
+            continue
+        kept.add(position)
+        used += cost
+
+    parts, previous = [], None
+    for position in sorted(kept):
+        if previous is not None and position != previous + 1:
+            parts.append("…")
+        parts.append(sentences[position][1])
+        previous = position
+    text = " ".join(parts)
+
+    packed = PackedContext(text, count_tokens(text), total - count_tokens(text), len(kept), len(sentences))
+    return _record(packed, total)
+
+
+def pack_for_endpoint(endpoint: str, query: str, context: str) -> PackedContext:
+    """pack_context with the endpoint's configured budget, logging what was trimmed."""
+    budget = CONTEXT_TOKEN_BUDGETS.get(endpoint, DEFAULT_CONTEXT_TOKENS)
+    packed = pack_context(query, context, budget)
+    if packed.trimmed_tokens:
+        logging.info(
+            f"Packed {endpoint} context to {packed.tokens}/{budget} tokens, trimmed {packed.trimmed_tokens} "
+            f"({packed.sentences_kept}/{packed.sentences_total} sentences kept)"
+        )
+    return packed
+
+
+def _record(packed: PackedContext, tokens_in: int) -> PackedContext:
+    with _stats_lock:
+        _stats["calls"] += 1
+        _stats["tokens_in"] += tokens_in
+        _stats["tokens_out"] += packed.tokens
+        _stats["trimmed_tokens"] += packed.trimmed_tokens
+    return packed
+
+
+def context_stats() -> dict:
+    """Token counters of every packed context since process start."""
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,377 @@
+# db.py
+import os
+import queue
+import sqlite3
+import logging
+import threading
+from datetime import date
+from contextlib import contextmanager
+
+# ----------------------------
+# Configuration
+# ----------------------------
+this_dir = os.path.dirname(os.path.abspath(__file__))
+
+DB_PATH = os.getenv("HEALTH_DB_PATH", os.path.join(this_dir, "health_advisor.db"))
+DB_POOL_SIZE = int(os.getenv("HEALTH_DB_POOL_SIZE", 8))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("HEALTH_DB_BUSY_TIMEOUT_MS", 5000))
+
+# WAL lets readers run alongside the single writer; NORMAL sync is durable across
+# application crashes (only an OS crash can lose the last commits).
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA mmap_size=67108864",
+)
+
+# Tables as the pages originally created them; later versions are reached through MIGRATIONS
+BASELINE_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        username TEXT PRIMARY KEY
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS personal_info (
+        username TEXT,
+        full_name TEXT,
+        age INTEGER,
+        gender TEXT,
+        region TEXT,
+        education TEXT,
+        occupation TEXT,
+        marital_status TEXT,
+        weight REAL,
+        height REAL,
+        physical_activity TEXT,
+        diet TEXT,
+        smoking TEXT,
+        alcohol TEXT,
+        sleep_hours INTEGER,
+        family_history TEXT,
+        glucose_level REAL,
+        blood_pressure REAL,
+        cholesterol REAL,
+        bmi REAL,
+        previous_diagnosis TEXT,
+        medication TEXT,
+        goal TEXT,
+        condition TEXT,
+        FOREIGN KEY (username) REFERENCES users(username)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS nutrition_tracker (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT,
+        date TEXT,
+        meal_type TEXT,
+        food_items TEXT,
+        calories REAL,
+        carbs REAL,
+        protein REAL,
+        fat REAL,
+        notes TEXT,
+        FOREIGN KEY (username) REFERENCES users(username)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS exercise_tracker (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT,
+        date TEXT,
+        exercise_type TEXT,
+        duration REAL,
+        intensity TEXT,
+        notes TEXT,
+        FOREIGN KEY (username) REFERENCES users(username)
+    )
+    """,
+)
+
+TRACKER_TABLES = ("nutrition_tracker", "exercise_tracker")
+
+
+# ----------------------------
+# Connection pool
+# ----------------------------
+_pool = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+_migrated = False
+_schema_lock = threading.Lock()
+
+def _connect() -> sqlite3.Connection:
+    # Streamlit runs every script rerun on a fresh thread, so connections are pooled
+    # and checked out per use instead of being tied to the thread that opened them.
+    conn = sqlite3.connect(DB_PATH, timeout=DB_BUSY_TIMEOUT_MS / 1000,
+                           check_same_thread=False, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def init_db() -> None:
+    """Bring the schema up to date once per process (later calls return immediately)."""
+    global _migrated
+    if _migrated:
+        return
+    with _schema_lock:
+        if _migrated:
+            return
+        conn = _connect()
+        try:
+            migrate(conn)
+        finally:
+            _release(conn)
+        _migrated = True
+        logging.info(f"Health database ready: {DB_PATH}")
+
+def _release(conn: sqlite3.Connection) -> None:
+    try:
+        _pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+@contextmanager
+def connection():
+    """
+    A pooled connection for the duration of the block, committed on success and
+    rolled back on error. Each connection keeps its own prepared-statement cache,
+    so repeated queries skip re-parsing.
+    """
+    init_db()
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = _connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        _release(conn)
+
+def execute(sql: str, params=()) -> None:
+    with connection() as conn:
+        conn.execute(sql, params)
+
+def fetch_one(sql: str, params=()) -> dict:
+    """First row as a {column: value} dict, or {} if there is none."""
+    with connection() as conn:
+        row = conn.execute(sql, params).fetchone()
+    return dict(row) if row else {}
+
+def fetch_all(sql: str, params=()) -> list:
+    with connection() as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+# ----------------------------
+# Migrations (PRAGMA user_version holds the applied version)
+# ----------------------------
+def _columns(conn: sqlite3.Connection, table: str) -> list:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+def _migrate_baseline(conn: sqlite3.Connection) -> None:
+    """Baseline tables, plus the columns older databases only gained through ALTER TABLE."""
+    for statement in BASELINE_SCHEMA:
+        conn.execute(statement)
+    for table, column, declaration in (
+        ("personal_info", "goal", "TEXT DEFAULT 'Balanced Diet'"),
+        ("personal_info", "condition", "TEXT DEFAULT 'None'"),
+        ("nutrition_tracker", "carbs", "REAL"),
+        ("nutrition_tracker", "protein", "REAL"),
+        ("nutrition_tracker", "fat", "REAL"),
+    ):
+        if column not in _columns(conn, table):
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+def _migrate_personal_info_key(conn: sqlite3.Connection) -> None:
+    """
+    Make username the primary key of personal_info so INSERT OR REPLACE replaces.
+    Only each user's most recently written row survives, and missing goal/condition
+    values get the defaults the nutrition dashboard expects. Columns are copied by
+    name, so databases with a different column order migrate the same way.
+    """
+    columns = ", ".join(("username",) + PERSONAL_INFO_FIELDS)
+    conn.execute("""
+        CREATE TABLE personal_info_new (
+            username TEXT PRIMARY KEY,
+            full_name TEXT,
+            age INTEGER,
+            gender TEXT,
+            region TEXT,
+            education TEXT,
+            occupation TEXT,
+            marital_status TEXT,
+            weight REAL,
+            height REAL,
+            physical_activity TEXT,
+            diet TEXT,
+            smoking TEXT,
+            alcohol TEXT,
+            sleep_hours INTEGER,
+            family_history TEXT,
+            glucose_level REAL,
+            blood_pressure REAL,
+            cholesterol REAL,
+            bmi REAL,
+            previous_diagnosis TEXT,
+            medication TEXT,
+            goal TEXT DEFAULT 'Balanced Diet',
+            condition TEXT DEFAULT 'None',
+            FOREIGN KEY (username) REFERENCES users(username)
+        )
+    """)
+    conn.execute(f"""
+        INSERT INTO personal_info_new ({columns})
+        SELECT {columns} FROM personal_info
+        WHERE rowid IN (SELECT MAX(rowid) FROM personal_info WHERE username IS NOT NULL GROUP BY username)
+    """)
+    conn.execute("""
+        UPDATE personal_info_new
+        SET goal = COALESCE(goal, 'Balanced Diet'), condition = COALESCE(condition, 'None')
+    """)
+    conn.execute("DROP TABLE personal_info")
+    conn.execute("ALTER TABLE personal_info_new RENAME TO personal_info")
+
+def _migrate_tracker_indexes(conn: sqlite3.Connection) -> None:
+    """
+    Covering indexes for the per-user tracker queries: the latest-entry lookups read
+    the first index entry for the user, and the summary aggregates never touch the table.
+    """
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_exercise_tracker_user_date
+        ON exercise_tracker (username, date, exercise_type, duration, intensity)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_nutrition_tracker_user_date
+        ON nutrition_tracker (username, date, meal_type, calories, carbs, protein, fat)
+    """)
+
+MIGRATIONS = (
+    (1, _migrate_baseline),
+    (2, _migrate_personal_info_key),
+    (3, _migrate_tracker_indexes),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def _user_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Apply every pending migration, each in its own write transaction together with
+    its user_version bump. Readers keep working on the last committed schema (WAL),
+    and a process that finds a migration already applied once it holds the write
+    lock skips it, so replicas can start against the same database concurrently.
+    Returns the schema version.
+    """
+    version = _user_version(conn)
+    if version > SCHEMA_VERSION:
+        logging.warning(f"Health database schema v{version} is newer than this code (v{SCHEMA_VERSION})")
+        return version
+
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None  # explicit transactions, so DDL and the version bump commit together
+    try:
+        for target, step in MIGRATIONS:
+            if version >= target:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if _user_version(conn) < target:
+                    step(conn)
+                    conn.execute(f"PRAGMA user_version = {target}")
+                    logging.info(f"Migrated health database to v{target} ({step.__name__})")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            version = target
+    finally:
+        conn.isolation_level = isolation_level
+    return version
+
+
+# ----------------------------
+# Users and personal info
+# ----------------------------
+PERSONAL_INFO_FIELDS = (
+    "full_name", "age", "gender", "region", "education", "occupation", "marital_status",
+    "weight", "height", "physical_activity", "diet", "smoking", "alcohol", "sleep_hours",
+    "family_history", "glucose_level", "blood_pressure", "cholesterol", "bmi",
+    "previous_diagnosis", "medication", "goal", "condition",
+)
+# The nutrition dashboard needs a goal and condition from its option lists
+PERSONAL_INFO_DEFAULTS = {"goal": "Balanced Diet", "condition": "None"}
+
+def add_user(username: str) -> None:
+    execute("INSERT OR IGNORE INTO users (username) VALUES (?)", (username,))
+
+def save_personal_info(username: str, data: dict) -> None:
+    columns = ("username",) + PERSONAL_INFO_FIELDS
+    values = [data.get(field) for field in PERSONAL_INFO_FIELDS]
+    values = [PERSONAL_INFO_DEFAULTS.get(field) if value is None else value
+              for field, value in zip(PERSONAL_INFO_FIELDS, values)]
+    execute(
+        f"INSERT OR REPLACE INTO personal_info ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        (username, *values)
+    )
+
+def get_personal_info(username: str, columns=None) -> dict:
+    """The user's personal info ({} if none), limited to `columns` when given."""
+    selected = ", ".join(columns) if columns else "*"
+    return fetch_one(f"SELECT {selected} FROM personal_info WHERE username = ?", (username,))
+
+
+# ----------------------------
+# Trackers
+# ----------------------------
+def log_nutrition(username: str, meal_type: str, food_items: str, calories: float, notes: str) -> None:
+    execute("""
+        INSERT INTO nutrition_tracker (username, date, meal_type, food_items, calories, notes)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (username, str(date.today()), meal_type, food_items, calories, notes))
+
+def log_exercise(username: str, exercise_type: str, duration: float, intensity: str, notes: str) -> None:
+    execute("""
+        INSERT INTO exercise_tracker (username, date, exercise_type, duration, intensity, notes)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (username, str(date.today()), exercise_type, duration, intensity, notes))
+
+def latest_exercise(username: str) -> dict:
+    return fetch_one("""
+        SELECT date, exercise_type, duration, intensity
+        FROM exercise_tracker
+        WHERE username = ?
+        ORDER BY date DESC LIMIT 1
+    """, (username,))
+
+def latest_nutrition(username: str) -> dict:
+    return fetch_one("""
+        SELECT date, meal_type, calories, carbs, protein, fat
+        FROM nutrition_tracker
+        WHERE username = ?
+        ORDER BY date DESC LIMIT 1
+    """, (username,))
+
+def view_logs(username: str, table_name: str, limit: int = 10) -> list:
+    """The user's most recent rows of a tracker table."""
+    if table_name not in TRACKER_TABLES:
+        raise ValueError(f"Unknown tracker table: {table_name}")
+    return [tuple(row) for row in fetch_all(
+        f"SELECT date, * FROM {table_name} WHERE username = ? ORDER BY date DESC LIMIT ?", (username, limit)
+    )]
+
+def get_summary(username: str):
+    """(average calories per meal logged, total exercise minutes) for a user."""
+    with connection() as conn:
+        avg_cal = conn.execute(
+            "SELECT AVG(calories) FROM nutrition_tracker WHERE username = ?", (username,)
+        ).fetchone()[0]
+        total_exercise = conn.execute(
+            "SELECT SUM(duration) FROM exercise_tracker WHERE username = ?", (username,)
+        ).fetchone()[0]
+    return avg_cal, total_exercise or 0
@@ -0,0 +1,251 @@
+# embedding_cache.py
+import os
+import re
+import sqlite3
+import hashlib
+import logging
+import threading
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# ----------------------------
+# Configuration
+# ----------------------------
+this_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "EMBEDDING_CACHE_DIR",
+    os.path.join(this_dir, "data", "embedding_cache")
+)
+# Storage type of new model files; float16 halves the size but rounds every vector
+DEFAULT_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float32")  # "float32" or "float16"
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Content-addressed vector store keyed on (model_id, sha256(text)).
+    Vectors of each model are appended to one flat binary file and read back
+    through a memory map; a SQLite table maps every key to its row in that file.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, dtype=DEFAULT_DTYPE):
+        self.cache_dir = cache_dir
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.Lock()
+        self._maps = {}  # model_id -> (memmap, rows mapped)
+        self._stats = {"hits": 0, "misses": 0, "stores": 0}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        # Autocommit, so put_many can hold an explicit write transaction across processes
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "index.sqlite3"), timeout=30,
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS models (
+                model_id TEXT PRIMARY KEY,
+                dim INTEGER,
+                dtype TEXT,
+                file TEXT
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS vectors (
+                model_id TEXT,
+                text_hash TEXT,
+                row INTEGER,
+                PRIMARY KEY (model_id, text_hash)
+            )
+        """)
+        self._conn.commit()
+
+    # ----------------------------
+    # Lookup / store
+    # ----------------------------
+    def get_many(self, model_id: str, hashes) -> dict:
+        """Return {text hash: float32 vector} for every hash that is cached."""
+        hashes = list(dict.fromkeys(hashes))
+        found = {}
+        with self._lock:
+            model = self._model(model_id)
+            if model is None:
+                self._stats["misses"] += len(hashes)
+                return found
+
+            rows = {}
+            for i in range(0, len(hashes), 500):
+                part = hashes[i:i + 500]
+                placeholders = ",".join("?" * len(part))
+                rows.update(self._conn.execute(
+                    f"SELECT text_hash, row FROM vectors WHERE model_id = ? AND text_hash IN ({placeholders})",
+                    (model_id, *part)
+                ).fetchall())
+
+            if rows:
+                vectors = self._vectors(model_id, model, max(rows.values()) + 1)
+                for text_hash, row in rows.items():
+                    found[text_hash] = np.asarray(vectors[row], dtype=np.float32)
+            self._stats["hits"] += len(found)
+            self._stats["misses"] += len(hashes) - len(found)
+        return found
+
+    def put_many(self, model_id: str, items: dict) -> dict:
+        """
+        Append {text hash: vector} to the model's vector file and index the new rows.
+        The append and the index insert run inside one BEGIN IMMEDIATE transaction,
+        which SQLite serializes across processes, so concurrent writers never claim
+        the same rows. Returns {text hash: float32 vector} exactly as get_many() will
+        return it later (rounded to the file's dtype).
+        """
+        if not items:
+            return {}
+        dim = len(next(iter(items.values())))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                stored_dtype = self._append(model_id, items, dim)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return {h: np.asarray(v, dtype=stored_dtype).astype(np.float32) for h, v in items.items()}
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    # ----------------------------
+    # Internals (caller holds the lock)
+    # ----------------------------
+    def _append(self, model_id: str, items: dict, dim: int):
+        """Body of put_many; runs inside its write transaction. Returns the dtype the vectors are stored in."""
+        model = self._model(model_id)
+        if model is None:
+            file_name = f"{re.sub(r'[^A-Za-z0-9._-]', '_', model_id)}.{self.dtype.name}.bin"
+            self._conn.execute(
+                "INSERT INTO models (model_id, dim, dtype, file) VALUES (?, ?, ?, ?)",
+                (model_id, dim, self.dtype.name, file_name)
+            )
+            model = self._model(model_id)
+        if dim != model["dim"]:
+            logging.warning(f"Embedding cache: {model_id} returned {dim}-d vectors, expected {model['dim']}")
+            return np.float32
+
+        known = set()
+        keys = list(items)
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            placeholders = ",".join("?" * len(part))
+            known.update(h for (h,) in self._conn.execute(
+                f"SELECT text_hash FROM vectors WHERE model_id = ? AND text_hash IN ({placeholders})",
+                (model_id, *part)
+            ))
+        new_keys = [h for h in keys if h not in known]
+        if not new_keys:
+            return model["dtype"]
+
+        # An interrupted append can leave a partial row at the end; cut it off so
+        # every row keeps its offset. Rows are written before they are indexed, so a
+        # crash only leaves unreferenced rows.
+        path = os.path.join(self.cache_dir, model["file"])
+        row_bytes = model["dim"] * np.dtype(model["dtype"]).itemsize
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size % row_bytes:
+            os.truncate(path, size - size % row_bytes)
+        first_row = size // row_bytes
+        block = np.asarray([items[h] for h in new_keys], dtype=model["dtype"])
+        with open(path, "ab") as f:
+            f.write(block.tobytes())
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO vectors (model_id, text_hash, row) VALUES (?, ?, ?)",
+            [(model_id, h, first_row + i) for i, h in enumerate(new_keys)]
+        )
+        self._stats["stores"] += len(new_keys)
+        return model["dtype"]
+
+    def _model(self, model_id: str):
+        row = self._conn.execute(
+            "SELECT dim, dtype, file FROM models WHERE model_id = ?", (model_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"dim": row[0], "dtype": row[1], "file": row[2]}
+
+    def _vectors(self, model_id: str, model: dict, rows_needed: int):
+        """Memory map of the model's vector file, remapped when it has grown past the mapped rows."""
+        mapped = self._maps.get(model_id)
+        if mapped is None or mapped[1] < rows_needed:
+            path = os.path.join(self.cache_dir, model["file"])
+            row_bytes = model["dim"] * np.dtype(model["dtype"]).itemsize
+            rows = os.path.getsize(path) // row_bytes
+            vectors = np.memmap(path, dtype=model["dtype"], mode="r", shape=(rows, model["dim"]))
+            mapped = self._maps[model_id] = (vectors, rows)
+        return mapped[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves repeated texts from an EmbeddingStore and only
+    sends unseen texts to the wrapped model. Queries and documents share the cache,
+    which assumes the wrapped model embeds both the same way (as Watsonx does).
+    """
+
+    def __init__(self, embeddings: Embeddings, model_id: str, store: EmbeddingStore = None):
+        self.embeddings = embeddings
+        self.model_id = model_id
+        self.store = store if store is not None else get_embedding_store()
+
+    @property
+    def provider_id(self) -> str:
+        return self.model_id
+
+    def _lookup(self, texts):
+        """(text hashes, {hash: cached vector}, {hash: text} of the misses)."""
+        hashes = [text_sha256(text) for text in texts]
+        cached = self.store.get_many(self.model_id, hashes)
+        missing = {}
+        for text_hash, text in zip(hashes, texts):
+            if text_hash not in cached:
+                missing.setdefault(text_hash, text)
+        return hashes, cached, missing
+
+    def _fill(self, hashes, cached: dict, missing: dict, vectors) -> list:
+        if missing:
+            # Misses return the stored (possibly rounded) vectors too, so results never depend on cache state
+            cached.update(self.store.put_many(self.model_id, dict(zip(missing, vectors))))
+        return [cached[text_hash].tolist() for text_hash in hashes]
+
+    def embed_documents(self, texts):
+        hashes, cached, missing = self._lookup(texts)
+        vectors = self.embeddings.embed_documents(list(missing.values())) if missing else []
+        return self._fill(hashes, cached, missing, vectors)
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts):
+        # The cache is local; only the misses go to the wrapped model's async API
+        hashes, cached, missing = self._lookup(texts)
+        vectors = await self.embeddings.aembed_documents(list(missing.values())) if missing else []
+        return self._fill(hashes, cached, missing, vectors)
+
+    async def aembed_query(self, text):
+        return (await self.aembed_documents([text]))[0]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_embedding_store() -> EmbeddingStore:
+    """Process-wide store shared by every CachedEmbeddings instance."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EmbeddingStore()
+        return _store
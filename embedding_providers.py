@@ -0,0 +1,109 @@
+# embedding_providers.py
+import os
+import re
+import hashlib
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from embedding_cache import CachedEmbeddings
+
+# ----------------------------
+# Configuration
+# ----------------------------
+# "watsonx" (remote, default), "hashing" (offline, for tests and builds without
+# credentials) or "sentence-transformers" (local CPU model, optional dependency)
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "watsonx")
+WATSONX_EMBEDDING_MODEL_ID = "ibm/granite-embedding-278m-multilingual"
+LOCAL_EMBEDDING_MODEL = os.getenv(
+    "LOCAL_EMBEDDING_MODEL",
+    "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+)
+HASHING_DIM = int(os.getenv("HASHING_EMBEDDING_DIM", 768))
+
+# Collections built before providers were recorded were all embedded with Watsonx
+DEFAULT_PROVIDER_ID = f"watsonx:{WATSONX_EMBEDDING_MODEL_ID}"
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Signed feature hashing of word unigrams and bigrams into a fixed-size,
+    L2-normalized vector. Deterministic, dependency-free and instant, so stores
+    can be built and queried offline; recall is lexical rather than semantic.
+    """
+
+    def __init__(self, dim: int = HASHING_DIM):
+        self.dim = dim
+
+    def _vector(self, text: str) -> list:
+        words = re.findall(r"\w+", (text or "").lower())
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dim] += 1.0 if (value >> 63) & 1 else -1.0
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """Local CPU sentence-transformers model (pip install sentence-transformers)."""
+
+    def __init__(self, model_name: str = LOCAL_EMBEDDING_MODEL):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "EMBEDDING_PROVIDER=sentence-transformers requires `pip install sentence-transformers`"
+            ) from e
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def embed_documents(self, texts):
+        vectors = self.model.encode(list(texts), batch_size=32, normalize_embeddings=True, convert_to_numpy=True)
+        return vectors.tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def provider_id(provider: str = None) -> str:
+    """Identifier recorded with every collection, e.g. "hashing:768"."""
+    provider = provider or EMBEDDING_PROVIDER
+    if provider == "watsonx":
+        return DEFAULT_PROVIDER_ID
+    if provider == "hashing":
+        return f"hashing:{HASHING_DIM}"
+    if provider == "sentence-transformers":
+        return f"sentence-transformers:{LOCAL_EMBEDDING_MODEL}"
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER: {provider}")
+
+def embedding_provider_id(embeddings):
+    """Provider id of an embeddings object built by create_embeddings, else None."""
+    return getattr(embeddings, "provider_id", None)
+
+def create_embeddings(provider: str = None) -> CachedEmbeddings:
+    """
+    Embeddings for the configured provider, behind the on-disk embedding cache.
+    The cache is keyed on the provider id, so providers never share vectors.
+    """
+    provider = provider or EMBEDDING_PROVIDER
+    if provider == "watsonx":
+        from langchain_ibm import WatsonxEmbeddings
+        base = WatsonxEmbeddings(
+            model_id=WATSONX_EMBEDDING_MODEL_ID,
+            url=os.getenv("WATSONX_URL"),
+            project_id=os.getenv("WATSONX_PROJECT_ID"),
+            apikey=os.getenv("WATSONX_APIKEY"),
+        )
+    elif provider == "hashing":
+        base = HashingEmbeddings()
+    elif provider == "sentence-transformers":
+        base = SentenceTransformerEmbeddings()
+    else:
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER: {provider}")
+    return CachedEmbeddings(base, model_id=provider_id(provider))
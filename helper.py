@@ -1,34 +1,15 @@
 # helper.py
-from dotenv import load_dotenv
-import os
 import logging
-from langchain_ibm import WatsonxLLM
+from resources import start_warmup
 # from langchain.memory import ConversationBufferMemory
 
 # ----------------------------
-# Load environment variables
+# Shared Watsonx Granite LLM
 # ----------------------------
-load_dotenv()
-api_key = os.getenv("WATSONX_APIKEY")
-url = os.getenv("WATSONX_URL")
-project_id = os.getenv("WATSONX_PROJECT_ID")
-
-# ----------------------------
-# Initialize Watsonx Granite LLM
-# ----------------------------
-llm = WatsonxLLM(
-    model_id="ibm/granite-3-8b-instruct",
-    url=url,
-    project_id=project_id,
-    apikey=api_key,
-    params={
-        "decoding_method": "greedy",
-        "temperature": 0.7,
-        "min_new_tokens": 5,
-        "max_new_tokens": 400,
-        "repetition_penalty": 1.2
-    }
-)
+# Pages can be opened directly without index.py, so make sure warm-up has started.
+# The LLM itself is fetched with resources.get_llm() at call time, so importing a
+# page never waits for it to be built.
+start_warmup()
 
 # ----------------------------
 # Conversation memory
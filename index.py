@@ -1,5 +1,5 @@
 import streamlit as st
-from main import get_response
+from main import stream_response
 import logging
 import re
 
@@ -54,6 +54,51 @@ def format_ai_response(response: str) -> str:
     return response
 
 
+# --------------------------------------------
+# Helper: apply the same cleanup while tokens stream in
+# --------------------------------------------
+class IncrementalFormatter:
+    """
+    Cleans streamed text chunk by chunk. Text that could still be the start of an
+    "Assistant:" prefix or a <n> citation tag is held back until the next chunk
+    decides it. The citations block is only reformatted by finish().
+    """
+    PREFIX = "assistant:"
+
+    def __init__(self):
+        self.raw = ""
+        self.clean = ""
+        self._pending = ""
+
+    def _holdback(self, text: str) -> int:
+        # Unclosed citation tag such as "<1" or "<"
+        lt = text.rfind("<")
+        if lt != -1 and re.fullmatch(r"<\d*", text[lt:]):
+            return len(text) - lt
+        # Partial "Assistant:" at the end of the buffer
+        lowered = text.lower()
+        for size in range(min(len(self.PREFIX) - 1, len(text)), 0, -1):
+            if self.PREFIX.startswith(lowered[-size:]):
+                return size
+        return 0
+
+    def feed(self, chunk: str) -> str:
+        self.raw += chunk
+        text = self._pending + chunk
+        keep = self._holdback(text)
+        ready, self._pending = text[:len(text) - keep], text[len(text) - keep:]
+
+        if not self.clean:
+            ready = re.sub(r"(?i)^assistant:\s*", "", ready.lstrip())
+        ready = re.sub(r"(?i)assistant:", "", ready)
+        ready = re.sub(r"<(\d+)>", r"[\1]", ready)
+        self.clean += ready.replace("\r\n", "\n")
+        return self.clean
+
+    def finish(self) -> str:
+        return format_ai_response(self.raw)
+
+
 # --------------------------------------------
 # Home Page
 # --------------------------------------------
@@ -64,21 +109,27 @@ if page == "Home":
     user_input = st.text_input("Type your question below:")
 
     if st.button("Send") and user_input.strip():
-        with st.spinner("Thinking..."):
-            try:
-                # Get AI response
-                response = get_response(user_input, language)
-            except Exception as e:
-                logging.error(f"Error during get_response: {e}")
-                response = "Sorry, something went wrong. Please try again later."
-
         # --------------------------------------------
-        # Render AI response with Markdown formatting
+        # Render AI response incrementally as tokens arrive
         # --------------------------------------------
         st.markdown(f"**AI ({language}):**")
-
-        formatted_response = format_ai_response(response)
-        st.markdown(formatted_response, unsafe_allow_html=False)
+        placeholder = st.empty()
+        formatter = IncrementalFormatter()
+
+        try:
+            with st.spinner("Thinking..."):
+                # Get AI response; the spinner only covers time-to-first-token
+                chunks = stream_response(user_input, language)
+                first_chunk = next(chunks, "")
+            placeholder.markdown(formatter.feed(first_chunk), unsafe_allow_html=False)
+            for chunk in chunks:
+                placeholder.markdown(formatter.feed(chunk), unsafe_allow_html=False)
+        except Exception as e:
+            logging.error(f"Error during stream_response: {e}")
+            if not formatter.raw:
+                formatter.feed("Sorry, something went wrong. Please try again later.")
+
+        placeholder.markdown(formatter.finish(), unsafe_allow_html=False)
 
     else:
         st.info("Example: 'What is the best exercise for heart health?'")
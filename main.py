@@ -1,49 +1,16 @@
 # main.py
-from dotenv import load_dotenv
-import os
 import logging
-from langchain_ibm import WatsonxLLM
 from langchain.agents import create_agent
 from langchain.tools import BaseTool
 from tools.pubmed_retriever import medical_info_tool
-from tools.physical_activity_rag import build_physical_activity_rag
-from tools.nutrition_rag import build_nutrition_rag
-
-# ----------------------------
-# Load environment variables
-# ----------------------------
-load_dotenv()
-api_key = os.getenv("WATSONX_APIKEY")
-url = os.getenv("WATSONX_URL")
-project_id = os.getenv("WATSONX_PROJECT_ID")
-
-# ----------------------------
-# Initialize Watsonx Granite LLM
-# ----------------------------
-llm = WatsonxLLM(
-    model_id="ibm/granite-3-8b-instruct",
-    url=url,
-    project_id=project_id,
-    apikey=api_key,
-    params={
-        "decoding_method": "greedy",
-        "temperature": 0.7,
-        "min_new_tokens": 5,
-        "max_new_tokens": 400,
-        "repetition_penalty": 1.2
-    }
+from tools.corpus_registry import enabled_corpora
+from resources import (
+    get_llm, get_physical_activity_tool, get_nutrition_tool, get_corpus_tool,
+    get_or_create, get_semantic_router, is_ready, readiness, start_warmup
 )
-
-# ----------------------------
-# Build RAG Tools
-# ----------------------------
-physical_activity_tool = build_physical_activity_rag()
-if physical_activity_tool is None:
-    logging.warning("Physical Activity tool failed to initialize. Will fallback to LLM.")
-
-nutrition_tool = build_nutrition_rag()
-if nutrition_tool is None:
-    logging.warning("Nutrition tool failed to initialize. Will fallback to LLM.")
+from answer_cache import answer_cache
+from context_packer import context_stats
+from router import ROUTER_MODE, keyword_router, route_categories
 
 # ----------------------------
 # Logging setup
@@ -51,76 +18,72 @@ if nutrition_tool is None:
 logging.basicConfig(level=logging.INFO)
 
 # ----------------------------
-# Helper functions for routing
+# Background warm-up of the shared LLM and RAG tools
 # ----------------------------
-PHYSICAL_KEYWORDS = [
-    "exercise", "physical activity", "fitness", "workout", "aerobic",
-    "strength", "endurance", "cardio", "movement", "sports", "training",
-    "walking", "running", "yoga", "stretching", "cycling", "swimming", "resistance"
-]
-
-NUTRITION_KEYWORDS = [
-    "nutrition", "diet", "food", "nutrient", "protein", "carbohydrate", "fat",
-    "vitamin", "mineral", "fiber", "hydration", "balanced diet", "healthy eating",
-    "meal plan", "micronutrients", "macronutrients", "sodium", "cholesterol",
-    "sugar", "vegetables", "fruits", "whole grains", "dietary guideline"
-]
-
-GENERAL_HEALTH_KEYWORDS = [
-    "lifestyle", "sleep", "hydration", "stress", "mental health", "wellness"
-]
-
-def is_physical_activity_query(query: str) -> bool:
-    return any(kw.lower() in query.lower() for kw in PHYSICAL_KEYWORDS)
-
-def is_nutrition_query(query: str) -> bool:
-    return any(kw.lower() in query.lower() for kw in NUTRITION_KEYWORDS)
-
-def is_general_health_query(query: str) -> bool:
-    return any(kw.lower() in query.lower() for kw in GENERAL_HEALTH_KEYWORDS)
+# Nothing heavy is built at import time; queries that arrive before a tool
+# is hot are routed around it and fall back to the LLM.
+start_warmup()
 
 # ----------------------------
 # Multi-Agent Tools
 # ----------------------------
-tools_list = []
-
 # Physical Activity Agent
-if physical_activity_tool:
-    class PhysicalActivityAgent(BaseTool):
-        name: str = "PhysicalActivityAgent"
-        description: str = "Answers questions specifically about physical activity and exercise."
+class PhysicalActivityAgent(BaseTool):
+    name: str = "PhysicalActivityAgent"
+    description: str = "Answers questions specifically about physical activity and exercise."
 
-        def _run(self, query: str) -> str:
-            try:
-                return physical_activity_tool.run(query)
-            except Exception as e:
-                logging.error(f"Physical Activity sub-agent failed: {e}")
-                return "Physical Activity info not available."
+    def _run(self, query: str) -> str:
+        physical_activity_tool = get_physical_activity_tool(wait=False)
+        if physical_activity_tool is None:
+            logging.warning("Physical Activity tool is not warmed up yet.")
+            return "Physical Activity info not available."
+        try:
+            return physical_activity_tool.run(query)
+        except Exception as e:
+            logging.error(f"Physical Activity sub-agent failed: {e}")
+            return "Physical Activity info not available."
 
-        async def _arun(self, query: str) -> str:
-            raise NotImplementedError("Async not implemented.")
+    async def _arun(self, query: str) -> str:
+        physical_activity_tool = get_physical_activity_tool(wait=False)
+        if physical_activity_tool is None:
+            logging.warning("Physical Activity tool is not warmed up yet.")
+            return "Physical Activity info not available."
+        try:
+            return await physical_activity_tool.arun(query)
+        except Exception as e:
+            logging.error(f"Physical Activity sub-agent failed: {e}")
+            return "Physical Activity info not available."
 
-    physical_activity_agent = PhysicalActivityAgent()
-    tools_list.append(physical_activity_agent)
+physical_activity_agent = PhysicalActivityAgent()
 
 # Nutrition Agent
-if nutrition_tool:
-    class NutritionAgent(BaseTool):
-        name: str = "NutritionAgent"
-        description: str = "Answers questions specifically about nutrition and dietary guidelines."
+class NutritionAgent(BaseTool):
+    name: str = "NutritionAgent"
+    description: str = "Answers questions specifically about nutrition and dietary guidelines."
 
-        def _run(self, query: str) -> str:
-            try:
-                return nutrition_tool.run(query)
-            except Exception as e:
-                logging.error(f"Nutrition sub-agent failed: {e}")
-                return "Nutrition info not available."
+    def _run(self, query: str) -> str:
+        nutrition_tool = get_nutrition_tool(wait=False)
+        if nutrition_tool is None:
+            logging.warning("Nutrition tool is not warmed up yet.")
+            return "Nutrition info not available."
+        try:
+            return nutrition_tool.run(query)
+        except Exception as e:
+            logging.error(f"Nutrition sub-agent failed: {e}")
+            return "Nutrition info not available."
 
-        async def _arun(self, query: str) -> str:
-            raise NotImplementedError("Async not implemented.")
+    async def _arun(self, query: str) -> str:
+        nutrition_tool = get_nutrition_tool(wait=False)
+        if nutrition_tool is None:
+            logging.warning("Nutrition tool is not warmed up yet.")
+            return "Nutrition info not available."
+        try:
+            return await nutrition_tool.arun(query)
+        except Exception as e:
+            logging.error(f"Nutrition sub-agent failed: {e}")
+            return "Nutrition info not available."
 
-    nutrition_agent = NutritionAgent()
-    tools_list.append(nutrition_agent)
+nutrition_agent = NutritionAgent()
 
 # PubMed Agent
 class PubMedAgent(BaseTool):
@@ -135,10 +98,49 @@ class PubMedAgent(BaseTool):
             return "PubMed info not available."
 
     async def _arun(self, query: str) -> str:
-        raise NotImplementedError("Async not implemented.")
+        try:
+            return await medical_info_tool.arun(query)
+        except Exception as e:
+            logging.error(f"PubMed sub-agent failed: {e}")
+            return "PubMed info not available."
 
 pubmed_agent = PubMedAgent()
-tools_list.append(pubmed_agent)
+
+# Sub-agents for any other corpus enabled in tools/corpora.json
+class CorpusAgent(BaseTool):
+    name: str
+    description: str
+    corpus_name: str
+
+    def _run(self, query: str) -> str:
+        corpus_tool = get_corpus_tool(self.corpus_name, wait=False)
+        if corpus_tool is None:
+            logging.warning(f"{self.name} tool is not warmed up yet.")
+            return f"{self.name} info not available."
+        try:
+            return corpus_tool.run(query)
+        except Exception as e:
+            logging.error(f"{self.name} sub-agent failed: {e}")
+            return f"{self.name} info not available."
+
+    async def _arun(self, query: str) -> str:
+        corpus_tool = get_corpus_tool(self.corpus_name, wait=False)
+        if corpus_tool is None:
+            logging.warning(f"{self.name} tool is not warmed up yet.")
+            return f"{self.name} info not available."
+        try:
+            return await corpus_tool.arun(query)
+        except Exception as e:
+            logging.error(f"{self.name} sub-agent failed: {e}")
+            return f"{self.name} info not available."
+
+corpus_agents = [
+    CorpusAgent(name=corpus["agent_name"], description=corpus["agent_description"], corpus_name=corpus["name"])
+    for corpus in enabled_corpora()
+    if corpus["name"] not in ("physical_activity", "nutrition") and corpus.get("agent_name")
+]
+
+tools_list = [physical_activity_agent, nutrition_agent, pubmed_agent] + corpus_agents
 
 # ----------------------------
 # System Prompt
@@ -169,66 +171,196 @@ Focus on prevention, lifestyle improvement, and educational guidance only.
 """
 
 # ----------------------------
-# Initialize Main Agent (Multi-Agent)
+# Main Agent (Multi-Agent), created on first use
 # ----------------------------
-multi_agent = None
-try:
-    multi_agent = create_agent(
-        llm,
-        tools=tools_list,
-        system_prompt=system_prompt
-    )
-    logging.info("Multi-agent initialized successfully.")
-except Exception as e:
-    logging.error(f"Multi-agent initialization failed: {e}")
-    multi_agent = None
+def _build_multi_agent():
+    # Without an LLM there is no agent; returning None lets get_or_create retry later
+    llm = get_llm()
+    if llm is None:
+        logging.warning("Multi-agent not initialized: the LLM is unavailable.")
+        return None
+    try:
+        agent = create_agent(
+            llm,
+            tools=tools_list,
+            system_prompt=system_prompt
+        )
+        logging.info("Multi-agent initialized successfully.")
+        return agent
+    except Exception as e:
+        logging.error(f"Multi-agent initialization failed: {e}")
+        return None
+
+def get_multi_agent():
+    return get_or_create("multi_agent", _build_multi_agent)
 
 # ----------------------------
 # Main Response Function
 # ----------------------------
+LANGUAGE_PROMPTS = {
+    "English": "Respond in English.",
+    "Spanish": "Responde en español.",
+    "French": "Veuillez répondre en français.",
+    "Deutsch": "Bitte antworte auf Deutsch."
+}
+
+# Sub-agent messages that signal a failure and must never be cached
+UNAVAILABLE_RESPONSES = {
+    "Physical Activity info not available.",
+    "Nutrition info not available.",
+    "PubMed info not available.",
+    "Retriever is not available.",
+}
+
+def is_cacheable(answer: str) -> bool:
+    return bool(answer.strip()) and answer not in UNAVAILABLE_RESPONSES \
+        and not answer.startswith("Error retrieving data from PubMed")
+
+def route_query(user_input: str) -> str:
+    """
+    Decide which tool answers the query: physical_activity, nutrition, pubmed or agent.
+    """
+    # Semantic mode classifies by embedding similarity and falls back to keywords
+    # when unsure or while the router is warming up; keyword mode is one regex pass.
+    semantic_router = get_semantic_router(wait=False) if ROUTER_MODE == "semantic" else None
+    matches = route_categories(user_input, semantic_router)
+
+    # Tools that are still warming up are skipped rather than waited on
+    if "physical_activity" in matches and is_ready("physical_activity_tool"):
+        return "physical_activity"
+    if "nutrition" in matches and is_ready("nutrition_tool"):
+        return "nutrition"
+    if "general_health" in matches:
+        return "pubmed"
+    return "agent"
+
+def _dispatch(route: str, user_input: str, lang_instruction: str):
+    """
+    Run the routed tool and return the raw answer text, or None if every path failed.
+    """
+    if route == "physical_activity":
+        logging.info("Routing to Physical Activity Agent")
+        return physical_activity_agent._run(user_input)
+
+    if route == "nutrition":
+        logging.info("Routing to Nutrition Agent")
+        return nutrition_agent._run(user_input)
+
+    if route == "pubmed":
+        logging.info("Routing to PubMed Agent")
+        return pubmed_agent._run(user_input)
+
+    # Otherwise, use multi-agent
+    final_input = f"{lang_instruction}\nUser: {user_input}"
+    multi_agent = get_multi_agent()
+    if multi_agent:
+        try:
+            result = multi_agent.invoke({"input": final_input})
+            return result.get('output') if isinstance(result, dict) else str(result)
+        except Exception as ae:
+            logging.error(f"Multi-agent invocation failed: {ae}")
+
+    # Fallback to LLM
+    try:
+        logging.info("Falling back to LLM.generate()")
+        llm_result = get_llm().generate([final_input])
+        return llm_result.generations[0][0].text
+    except Exception as e:
+        logging.error(f"LLM fallback failed: {e}")
+        return None
+
 def get_response(user_input: str, language="English") -> str:
     try:
-        language_prompts = {
-            "English": "Respond in English.",
-            "Spanish": "Responde en español.",
-            "French": "Veuillez répondre en français.",
-            "Deutsch": "Bitte antworte auf Deutsch."
-        }
-        lang_instruction = language_prompts.get(language, "Respond in English.")
+        lang_instruction = LANGUAGE_PROMPTS.get(language, "Respond in English.")
 
         # Routing
-        if is_physical_activity_query(user_input) and physical_activity_tool:
-            logging.info("Routing to Physical Activity Agent")
-            return f"Assistant: {physical_activity_agent._run(user_input)}"
+        route = route_query(user_input)
 
-        if is_nutrition_query(user_input) and nutrition_tool:
-            logging.info("Routing to Nutrition Agent")
-            return f"Assistant: {nutrition_agent._run(user_input)}"
+        cached = answer_cache.get(user_input, language, route)
+        if cached is not None:
+            logging.info(f"Answer cache hit ({route})")
+            return f"Assistant: {cached}"
 
-        if is_general_health_query(user_input):
-            logging.info("Routing to PubMed Agent")
-            return f"Assistant: {pubmed_agent._run(user_input)}"
+        answer = _dispatch(route, user_input, lang_instruction)
+        if answer is None:
+            return "Assistant: Sorry, something went wrong. Please try again later."
 
-        # Otherwise, use multi-agent
-        if multi_agent:
-            final_input = f"{lang_instruction}\nUser: {user_input}"
+        if is_cacheable(answer):
+            answer_cache.set(user_input, language, route, answer)
+        return f"Assistant: {answer}"
+
+    except Exception as e:
+        logging.error(f"Unexpected error in get_response: {e}")
+        return "Assistant: Sorry, something went wrong. Please try again later."
+
+# ----------------------------
+# Streaming Response Function
+# ----------------------------
+def stream_response(user_input: str, language="English"):
+    """
+    Yield the answer in chunks as soon as they are available.
+    RAG and PubMed routes return whole passages; the LLM fallback streams tokens from Watsonx.
+    """
+    chunks = []
+    try:
+        lang_instruction = LANGUAGE_PROMPTS.get(language, "Respond in English.")
+        route = route_query(user_input)
+
+        cached = answer_cache.get(user_input, language, route)
+        if cached is not None:
+            logging.info(f"Answer cache hit ({route})")
+            yield cached
+            return
+
+        answer = None
+        multi_agent = get_multi_agent() if route == "agent" else None
+        if route != "agent":
+            answer = _dispatch(route, user_input, lang_instruction)
+        elif multi_agent:
             try:
-                result = multi_agent.invoke({"input": final_input})
-                return f"Assistant: {result.get('output') if isinstance(result, dict) else str(result)}"
+                result = multi_agent.invoke({"input": f"{lang_instruction}\nUser: {user_input}"})
+                answer = result.get('output') if isinstance(result, dict) else str(result)
             except Exception as ae:
                 logging.error(f"Multi-agent invocation failed: {ae}")
 
-        # Fallback to LLM
-        final_input = f"{lang_instruction}\nUser: {user_input}"
-        try:
-            logging.info("Falling back to LLM.generate()")
-            llm_result = llm.generate([final_input])
-            answer = llm_result.generations[0][0].text
-            return f"Assistant: {answer}"
-        except Exception as e:
-            logging.error(f"LLM fallback failed: {e}")
-            return "Assistant: Sorry, something went wrong. Please try again later."
+        if answer is not None:
+            if is_cacheable(answer):
+                answer_cache.set(user_input, language, route, answer)
+            yield answer
+            return
+
+        # Fallback to LLM, token by token
+        logging.info("Falling back to LLM.stream()")
+        for chunk in get_llm().stream(f"{lang_instruction}\nUser: {user_input}"):
+            if chunk:
+                chunks.append(chunk)
+                yield chunk
+
+        answer = "".join(chunks)
+        if is_cacheable(answer):
+            answer_cache.set(user_input, language, route, answer)
 
     except Exception as e:
-        logging.error(f"Unexpected error in get_response: {e}")
-        return "Assistant: Sorry, something went wrong. Please try again later."
+        logging.error(f"Unexpected error in stream_response: {e}")
+        if not chunks:
+            yield "Sorry, something went wrong. Please try again later."
+
+def get_cache_stats() -> dict:
+    """Hit/miss counters of the answer cache."""
+    return answer_cache.stats()
+
+def get_routing_stats() -> dict:
+    """Per-category keyword (and, in semantic mode, semantic) routing counters."""
+    stats = {"keyword": keyword_router.stats()}
+    semantic_router = get_semantic_router(wait=False) if ROUTER_MODE == "semantic" else None
+    if semantic_router is not None:
+        stats["semantic"] = semantic_router.stats()
+    return stats
+
+def get_context_stats() -> dict:
+    """Tokens retrieved, sent and trimmed by the RAG context packer."""
+    return context_stats()
+
+def get_readiness() -> dict:
+    """Which shared tools are hot, still warming up, or failed."""
+    return readiness()
@@ -2,7 +2,9 @@
 import streamlit as st
 import datetime
 import sqlite3
-from helper import llm, system_prompt
+from db import get_personal_info, latest_exercise, latest_nutrition
+from helper import system_prompt
+from resources import get_llm
 
 # ---------------------------- Helper Functions ----------------------------
 def get_user_data(username):
@@ -10,40 +12,11 @@ def get_user_data(username):
     Fetch user personal info, exercise, and nutrition data from SQLite database as a dictionary.
     """
     try:
-        conn = sqlite3.connect("health_advisor.db")
-        c = conn.cursor()
-
-        # Personal info
-        c.execute("SELECT * FROM personal_info WHERE username = ?", (username,))
-        personal = c.fetchone()
-        personal_cols = [desc[0] for desc in c.description] if personal else []
-        personal_info = dict(zip(personal_cols, personal)) if personal else {}
-
-        # Most recent exercise
-        c.execute("""
-            SELECT date, exercise_type, duration, intensity 
-            FROM exercise_tracker 
-            WHERE username = ? 
-            ORDER BY date DESC LIMIT 1
-        """, (username,))
-        exercise = c.fetchone()
-        exercise_cols = [desc[0] for desc in c.description] if exercise else []
-        exercise_info = dict(zip(exercise_cols, exercise)) if exercise else {}
-
-        # Most recent nutrition
-        c.execute("""
-            SELECT date, meal_type, calories, carbs, protein, fat 
-            FROM nutrition_tracker 
-            WHERE username = ? 
-            ORDER BY date DESC LIMIT 1
-        """, (username,))
-        nutrition = c.fetchone()
-        nutrition_cols = [desc[0] for desc in c.description] if nutrition else []
-        nutrition_info = dict(zip(nutrition_cols, nutrition)) if nutrition else {}
-
-        conn.close()
-        return {"personal": personal_info, "exercise": exercise_info, "nutrition": nutrition_info}
-
+        return {
+            "personal": get_personal_info(username),
+            "exercise": latest_exercise(username),
+            "nutrition": latest_nutrition(username)
+        }
     except sqlite3.Error as e:
         st.error(f"Database error: {e}")
         return None
@@ -125,7 +98,7 @@ else:
                 Recent meal: {nutrition.get('meal_type', 'N/A')} with {nutrition.get('calories', 'N/A')} kcal.
                 Include diet, exercise, stress management, and routine check-up recommendations.
                 """
-                response = llm.invoke(prompt)
+                response = get_llm().invoke(prompt)
                 st.markdown("### AI-Generated Prevention Guidance")
                 st.markdown(response)
 
@@ -141,7 +114,7 @@ else:
                 and activity level '{physical_activity}'. Ensure each tip is actionable, realistic, 
                 and promotes long-term heart health.
                 """
-                response = llm.invoke(prompt)
+                response = get_llm().invoke(prompt)
                 st.markdown(f"### Tips for {today}")
                 st.markdown(response)
 
@@ -159,7 +132,7 @@ else:
                 its risk factors, early signs, and preventive measures. 
                 Summarize using simple language suitable for public education.
                 """
-                response = llm.invoke(prompt)
+                response = get_llm().invoke(prompt)
                 st.markdown(f"### {topic} Overview")
                 st.markdown(response)
 
@@ -181,7 +154,7 @@ else:
                 Recent meal: {nutrition.get('meal_type', 'N/A')} ({nutrition.get('calories', 'N/A')} kcal). 
                 Return tips as a numbered list.
                 """
-                tips_response = llm.invoke(prompt)
+                tips_response = get_llm().invoke(prompt)
                 # Split tips into list
                 tips_list = [tip.strip() for tip in tips_response.split("\n") if tip.strip()]
                 st.session_state["cvd_tracker"][today] = {tip: False for tip in tips_list}
@@ -2,7 +2,9 @@
 import streamlit as st
 import datetime
 import sqlite3
-from helper import llm, system_prompt
+from db import get_personal_info, latest_exercise, latest_nutrition
+from helper import system_prompt
+from resources import get_llm
 
 # ---------------------------- Helper Functions ----------------------------
 def get_user_data(username):
@@ -10,45 +12,11 @@ def get_user_data(username):
     Fetch user personal info, exercise, and nutrition data from SQLite database as a dictionary.
     """
     try:
-        conn = sqlite3.connect("health_advisor.db")
-        c = conn.cursor()
-
-        # Fetch personal info
-        c.execute("SELECT * FROM personal_info WHERE username = ?", (username,))
-        personal = c.fetchone()
-        personal_cols = [desc[0] for desc in c.description] if personal else []
-        personal_info = dict(zip(personal_cols, personal)) if personal else {}
-
-        # Fetch most recent exercise record
-        c.execute("""
-            SELECT date, exercise_type, duration, intensity 
-            FROM exercise_tracker 
-            WHERE username = ? 
-            ORDER BY date DESC LIMIT 1
-        """, (username,))
-        exercise = c.fetchone()
-        exercise_cols = [desc[0] for desc in c.description] if exercise else []
-        exercise_info = dict(zip(exercise_cols, exercise)) if exercise else {}
-
-        # Fetch most recent nutrition record
-        c.execute("""
-            SELECT date, meal_type, calories, carbs, protein, fat 
-            FROM nutrition_tracker 
-            WHERE username = ? 
-            ORDER BY date DESC LIMIT 1
-        """, (username,))
-        nutrition = c.fetchone()
-        nutrition_cols = [desc[0] for desc in c.description] if nutrition else []
-        nutrition_info = dict(zip(nutrition_cols, nutrition)) if nutrition else {}
-
-        conn.close()
-
         return {
-            "personal": personal_info,
-            "exercise": exercise_info,
-            "nutrition": nutrition_info
+            "personal": get_personal_info(username),
+            "exercise": latest_exercise(username),
+            "nutrition": latest_nutrition(username)
         }
-
     except sqlite3.Error as e:
         st.error(f"Database error: {e}")
         return None
@@ -135,7 +103,7 @@ else:
                 and diet quality: {diet_quality}. 
                 Provide a short summary of potential risk and prevention recommendations.
                 """
-                response = llm.invoke(prompt)
+                response = get_llm().invoke(prompt)
                 st.markdown("### Risk Assessment Result")
                 st.markdown(response)
 
@@ -153,7 +121,7 @@ else:
                 for the user {username} focusing on {focus_area}.
                 Include practical steps and evidence-based recommendations suitable for adults.
                 """
-                response = llm.invoke(prompt)
+                response = get_llm().invoke(prompt)
                 st.markdown("### Lifestyle Guidance")
                 st.markdown(response)
 
@@ -167,7 +135,7 @@ else:
                 Generate 3 concise, actionable daily tips for preventing diabetes for a {age}-year-old {sex}. 
                 Ensure the tips are practical for everyday life and evidence-based.
                 """
-                response = llm.invoke(prompt)
+                response = get_llm().invoke(prompt)
                 st.markdown(f"### Tips for {today}")
                 st.markdown(response)
 
@@ -190,7 +158,7 @@ else:
                 Recent meal: {nutrition.get('meal_type', 'N/A')} ({nutrition.get('calories', 'N/A')} kcal). 
                 Return the activities as a numbered list.
                 """
-                response = llm.invoke(prompt)
+                response = get_llm().invoke(prompt)
                 activities = [line.strip() for line in response.split("\n") if line.strip()]
                 st.session_state["diabetes_tracker"][today] = {act: False for act in activities}
 
@@ -2,7 +2,8 @@
 import streamlit as st
 import datetime
 import sqlite3
-from agents.nutrition_agent import get_nutrition_response
+from db import get_personal_info
+from agents.nutrition_agent import stream_nutrition_response
 
 # ---------------------------- Helper Functions ----------------------------
 def get_user_data(username):
@@ -11,19 +12,10 @@ def get_user_data(username):
     Returns empty dict if no data found.
     """
     try:
-        conn = sqlite3.connect("health_advisor.db")
-        c = conn.cursor()
-        c.execute("SELECT age, gender, goal, condition FROM personal_info WHERE username = ?", (username,))
-        row = c.fetchone()
-        if row:
-            columns = [desc[0] for desc in c.description]
-            return dict(zip(columns, row))
-        return {}
+        return get_personal_info(username, ("age", "gender", "goal", "condition"))
     except sqlite3.Error as e:
         st.error(f"Database error: {e}")
         return {}
-    finally:
-        conn.close()
 
 # ---------------------------- Streamlit App ----------------------------
 st.header("🍎 Nutrition & Healthy Lifestyle Dashboard")
@@ -88,9 +80,9 @@ else:
                 f"Provide a detailed nutrition plan for a {age}-year-old {sex} with {condition}. "
                 f"The goal is {goal}. Include meal balance, nutrient focus, and portion guidance."
             )
-            plan = get_nutrition_response(query)
             st.markdown("### AI Nutrition Plan")
-            st.markdown(plan.replace("\n", "  \n"))  # preserve line breaks
+            # Stream tokens as they arrive, preserving line breaks
+            st.write_stream(chunk.replace("\n", "  \n") for chunk in stream_nutrition_response(query))
 
     # ---------------------------- TAB 2: Daily Nutrition Tips ----------------------------
     with tab2:
@@ -101,9 +93,8 @@ else:
                 f"Generate 3 practical daily nutrition tips for a {age}-year-old {sex} with {condition}, "
                 f"aiming for {goal}. Focus on hydration, food diversity, and meal timing."
             )
-            tips = get_nutrition_response(query_tips)
             st.markdown("### Daily Nutrition Tips")
-            st.markdown(tips.replace("\n", "  \n"))
+            st.write_stream(chunk.replace("\n", "  \n") for chunk in stream_nutrition_response(query_tips))
 
     # ---------------------------- TAB 3: Hydration & Meal Tracker ----------------------------
     with tab3:
@@ -142,8 +133,7 @@ else:
         )
         if st.button("Get Insight", key="nt_insight_btn"):
             if insights_query.strip():
-                response = get_nutrition_response(insights_query)
                 st.markdown("### AI Nutrition Insight")
-                st.markdown(response.replace("\n", "  \n"))
+                st.write_stream(chunk.replace("\n", "  \n") for chunk in stream_nutrition_response(insights_query))
             else:
                 st.warning("Please enter a question to get insights.")
@@ -1,159 +1,10 @@
 import streamlit as st
-import sqlite3
-from datetime import date
-
-# --- DATABASE SETUP ---
-def init_db():
-    conn = sqlite3.connect("health_advisor.db")
-    c = conn.cursor()
-
-    # User Table
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            username TEXT PRIMARY KEY
-        )
-    """)
-
-    # General health data
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS personal_info (
-            username TEXT,
-            full_name TEXT,
-            age INTEGER,
-            gender TEXT,
-            region TEXT,
-            education TEXT,
-            occupation TEXT,
-            marital_status TEXT,
-            weight REAL,
-            height REAL,
-            physical_activity TEXT,
-            diet TEXT,
-            smoking TEXT,
-            alcohol TEXT,
-            sleep_hours INTEGER,
-            family_history TEXT,
-            glucose_level REAL,
-            blood_pressure REAL,
-            cholesterol REAL,
-            bmi REAL,
-            previous_diagnosis TEXT,
-            medication TEXT,
-            goal TEXT,
-            condition TEXT,
-            FOREIGN KEY (username) REFERENCES users(username)
-        )
-    """)
-
-    # Nutrition Tracker
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS nutrition_tracker (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT,
-            date TEXT,
-            meal_type TEXT,
-            food_items TEXT,
-            calories REAL,
-            carbs REAL,
-            protein REAL,
-            fat REAL,
-            notes TEXT,
-            FOREIGN KEY (username) REFERENCES users(username)
-        )
-    """)
-
-    # Exercise Tracker
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS exercise_tracker (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT,
-            date TEXT,
-            exercise_type TEXT,
-            duration REAL,
-            intensity TEXT,
-            notes TEXT,
-            FOREIGN KEY (username) REFERENCES users(username)
-        )
-    """)
-
-    conn.commit()
-    conn.close()
-
-
-# --- SAVE FUNCTIONS ---
-def add_user(username):
-    conn = sqlite3.connect("health_advisor.db")
-    c = conn.cursor()
-    c.execute("INSERT OR IGNORE INTO users (username) VALUES (?)", (username,))
-    conn.commit()
-    conn.close()
-
-def save_personal_info(username, data):
-    conn = sqlite3.connect("health_advisor.db")
-    c = conn.cursor()
-    c.execute("""
-        INSERT OR REPLACE INTO personal_info (
-            username, full_name, age, gender, region, education, occupation, marital_status,
-            weight, height, physical_activity, diet, smoking, alcohol, sleep_hours,
-            family_history, glucose_level, blood_pressure, cholesterol, bmi,
-            previous_diagnosis, medication
-        ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-    """, (
-        username,
-        data.get("full_name"), data.get("age"), data.get("gender"), data.get("region"),
-        data.get("education"), data.get("occupation"), data.get("marital_status"),
-        data.get("weight"), data.get("height"), data.get("physical_activity"), data.get("diet"),
-        data.get("smoking"), data.get("alcohol"), data.get("sleep_hours"),
-        data.get("family_history"), data.get("glucose_level"), data.get("blood_pressure"),
-        data.get("cholesterol"), data.get("bmi"), data.get("previous_diagnosis"), data.get("medication")
-    ))
-    conn.commit()
-    conn.close()
-
-def log_nutrition(username, meal_type, food_items, calories, notes):
-    conn = sqlite3.connect("health_advisor.db")
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO nutrition_tracker (username, date, meal_type, food_items, calories, notes)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (username, str(date.today()), meal_type, food_items, calories, notes))
-    conn.commit()
-    conn.close()
-
-def log_exercise(username, exercise_type, duration, intensity, notes):
-    conn = sqlite3.connect("health_advisor.db")
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO exercise_tracker (username, date, exercise_type, duration, intensity, notes)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (username, str(date.today()), exercise_type, duration, intensity, notes))
-    conn.commit()
-    conn.close()
+from db import init_db, add_user, save_personal_info, log_nutrition, log_exercise, view_logs, get_summary, get_personal_info
 
 # --- MAIN APP ---
 init_db()
 st.title("Personal Health Advisor")
 
-# --- View recent logs ---
-def view_logs(username, table_name):
-    conn = sqlite3.connect("health_advisor.db")
-    c = conn.cursor()
-    c.execute(f"SELECT date, * FROM {table_name} WHERE username=? ORDER BY date DESC LIMIT 10", (username,))
-    rows = c.fetchall()
-    conn.close()
-    return rows
-
-# --- Summary statistics ---
-def get_summary(username):
-    conn = sqlite3.connect("health_advisor.db")
-    c = conn.cursor()
-    c.execute("SELECT AVG(calories) FROM nutrition_tracker WHERE username=?", (username,))
-    avg_cal = c.fetchone()[0]
-    c.execute("SELECT SUM(duration) FROM exercise_tracker WHERE username=?", (username,))
-    total_exercise = c.fetchone()[0]
-    conn.close()
-    return avg_cal, total_exercise or 0
-
 # --- Step 1: Enter Username ---
 if "username" not in st.session_state:
     st.session_state.username = None
@@ -172,11 +23,7 @@ else:
     st.success(f"Welcome, {st.session_state.username}!")
 
     # --- Check if the user already has personal info ---
-    conn = sqlite3.connect("health_advisor.db")
-    c = conn.cursor()
-    c.execute("SELECT * FROM personal_info WHERE username=?", (st.session_state.username,))
-    existing_data = c.fetchone()
-    conn.close()
+    existing_data = get_personal_info(st.session_state.username)
 
     # --- Helper function for BMI ---
     def calculate_bmi(weight, height_cm):
@@ -194,14 +41,7 @@ else:
         with tab1:
             st.subheader("Update Existing Information")
 
-            # Column names
-            columns = [
-                "username", "full_name", "age", "gender", "region", "education", "occupation",
-                "marital_status", "weight", "height", "physical_activity", "diet", "smoking",
-                "alcohol", "sleep_hours", "family_history", "glucose_level", "blood_pressure",
-                "cholesterol", "bmi", "previous_diagnosis", "medication"
-            ]
-            user_dict = dict(zip(columns, existing_data))
+            user_dict = existing_data
 
             st.info("Your current data is loaded. You can update any fields below.")
 
@@ -259,6 +99,16 @@ else:
             )
             medication = st.text_input("Current Medication", user_dict["medication"] or "")
 
+            st.write("### Nutrition Goals")
+            goal = st.selectbox(
+                "Nutrition Goal", ["Weight Loss", "Muscle Gain", "Balanced Diet", "Heart Health"],
+                index=["Weight Loss", "Muscle Gain", "Balanced Diet", "Heart Health"].index(user_dict["goal"]) if user_dict["goal"] in ["Weight Loss", "Muscle Gain", "Balanced Diet", "Heart Health"] else 2
+            )
+            condition = st.selectbox(
+                "Health Condition", ["None", "Diabetes", "Hypertension", "High Cholesterol", "Anemia"],
+                index=["None", "Diabetes", "Hypertension", "High Cholesterol", "Anemia"].index(user_dict["condition"]) if user_dict["condition"] in ["None", "Diabetes", "Hypertension", "High Cholesterol", "Anemia"] else 0
+            )
+
             if st.button("Save Updates"):
                 data = {
                     "full_name": full_name, "age": age, "gender": gender, "region": region,
@@ -267,7 +117,8 @@ else:
                     "diet": diet, "smoking": smoking, "alcohol": alcohol, "sleep_hours": sleep_hours,
                     "family_history": family_history, "glucose_level": glucose_level,
                     "blood_pressure": blood_pressure, "cholesterol": cholesterol, "bmi": bmi_value,
-                    "previous_diagnosis": previous_diagnosis, "medication": medication
+                    "previous_diagnosis": previous_diagnosis, "medication": medication,
+                    "goal": goal, "condition": condition
                 }
                 save_personal_info(st.session_state.username, data)
                 st.success("Information updated successfully!")
@@ -328,6 +179,10 @@ else:
             previous_diagnosis = st.selectbox("Previously Diagnosed with Diabetes?", ["No", "Yes"])
             medication = st.text_input("Current Medication")
 
+            st.write("### Nutrition Goals")
+            goal = st.selectbox("Nutrition Goal", ["Weight Loss", "Muscle Gain", "Balanced Diet", "Heart Health"], index=2)
+            condition = st.selectbox("Health Condition", ["None", "Diabetes", "Hypertension", "High Cholesterol", "Anemia"])
+
             if st.button("Submit New Info"):
                 data = {
                     "full_name": full_name, "age": age, "gender": gender, "region": region,
@@ -336,7 +191,8 @@ else:
                     "diet": diet, "smoking": smoking, "alcohol": alcohol, "sleep_hours": sleep_hours,
                     "family_history": family_history, "glucose_level": glucose_level,
                     "blood_pressure": blood_pressure, "cholesterol": cholesterol, "bmi": bmi_value,
-                    "previous_diagnosis": previous_diagnosis, "medication": medication
+                    "previous_diagnosis": previous_diagnosis, "medication": medication,
+                    "goal": goal, "condition": condition
                 }
                 save_personal_info(st.session_state.username, data)
                 st.success("Personal information saved successfully!")
@@ -1,8 +1,9 @@
 # physical_activity_dashboard.py
 import streamlit as st
 import sqlite3
+from db import get_personal_info, latest_exercise
 import datetime
-from agents.physical_activity_agent import get_physical_activity_response
+from agents.physical_activity_agent import get_physical_activity_response, stream_physical_activity_response
 
 # ---------------------------- Helper Functions ----------------------------
 def get_user_data(username):
@@ -10,33 +11,13 @@ def get_user_data(username):
     Fetch personal info and latest physical activity from database.
     """
     try:
-        conn = sqlite3.connect("health_advisor.db")
-        c = conn.cursor()
-
-        # Fetch personal info
-        c.execute("SELECT age, gender, physical_activity FROM personal_info WHERE username = ?", (username,))
-        personal = c.fetchone()
-        personal_info = dict(zip([desc[0] for desc in c.description], personal)) if personal else {}
-
-        # Fetch latest exercise record
-        c.execute("""
-            SELECT date, exercise_type, duration, intensity 
-            FROM exercise_tracker 
-            WHERE username = ? 
-            ORDER BY date DESC LIMIT 1
-        """, (username,))
-        exercise = c.fetchone()
-        exercise_info = dict(zip([desc[0] for desc in c.description], exercise)) if exercise else {}
-
         return {
-            "personal": personal_info,
-            "exercise": exercise_info
+            "personal": get_personal_info(username, ("age", "gender", "physical_activity")),
+            "exercise": latest_exercise(username)
         }
     except sqlite3.Error as e:
         st.error(f"Database error: {e}")
         return None
-    finally:
-        conn.close()
 
 # ---------------------------- Streamlit App ----------------------------
 st.header("🏃 Physical Activity Dashboard")
@@ -105,9 +86,8 @@ else:
                     f"Provide personalized exercise recommendations for a {age}-year-old {sex} "
                     f"with {condition}, focusing on {goal}. Include practical daily tips and simple exercises."
                 )
-                recommendation = get_physical_activity_response(query)
                 st.markdown("### AI Exercise Guidance")
-                st.markdown(recommendation)
+                st.write_stream(stream_physical_activity_response(query))
 
         # ---------------------------- Tab 3: Daily Tips & Tracker ----------------------------
         with tab3:
@@ -153,9 +133,8 @@ else:
 
             insights_query = st.text_area("Ask a question about physical activity (e.g., benefits, exercises, routines)")
             if st.button("Get Insight", key="pa_insight_btn"):
-                response = get_physical_activity_response(insights_query)
                 st.markdown("### AI Insight")
-                st.markdown(response)
+                st.write_stream(stream_physical_activity_response(insights_query))
 
 # ---------------------------- Disclaimer ----------------------------
 st.markdown("---")
@@ -0,0 +1,184 @@
+# resources.py
+from dotenv import load_dotenv
+import os
+import time
+import logging
+import threading
+from langchain_ibm import WatsonxLLM
+from tools.corpus_registry import build_corpus_tool, enabled_corpora, get_corpus
+from router import ROUTER_MODE, SemanticRouter
+from embedding_providers import create_embeddings, embedding_provider_id
+from tools.snapshot import load_snapshot_on_startup
+
+# ----------------------------
+# Load environment variables
+# ----------------------------
+load_dotenv()
+api_key = os.getenv("WATSONX_APIKEY")
+url = os.getenv("WATSONX_URL")
+project_id = os.getenv("WATSONX_PROJECT_ID")
+
+LLM_MODEL_ID = "ibm/granite-3-8b-instruct"
+# Seconds before a resource whose build failed is built again
+RESOURCE_RETRY_SECONDS = float(os.getenv("RESOURCE_RETRY_SECONDS", 60))
+
+# ----------------------------
+# Process-wide registry
+# ----------------------------
+# Streamlit re-runs page scripts but imports modules once per server process,
+# so module-level singletons are shared by every session, page and agent.
+_resources = {}
+_status = {}
+_locks = {}
+_retry_at = {}
+_registry_lock = threading.Lock()
+
+def get_or_create(name: str, factory, wait: bool = True):
+    """
+    Return the resource registered under `name`, creating it on first use.
+    With wait=False, return None instead of blocking while it is still being built.
+    A failed build (an exception or a None result) is not registered: calls return
+    None for RESOURCE_RETRY_SECONDS, then the next call builds it again (in the
+    background when wait=False).
+    """
+    if name in _resources:
+        return _resources[name]
+    if time.monotonic() < _retry_at.get(name, 0):
+        return None
+    if not wait:
+        if name in _retry_at and not _lock_for(name).locked():
+            threading.Thread(target=_build, args=(name, factory), name=f"retry-{name}", daemon=True).start()
+        return None
+    return _build(name, factory)
+
+def _lock_for(name: str) -> threading.Lock:
+    with _registry_lock:
+        return _locks.setdefault(name, threading.Lock())
+
+def _build(name: str, factory):
+    with _lock_for(name):
+        if name in _resources:
+            return _resources[name]
+        # Another caller may have just failed while this one waited
+        if time.monotonic() < _retry_at.get(name, 0):
+            return None
+        logging.info(f"Creating shared resource: {name}")
+        _status[name] = "warming"
+        try:
+            resource = factory()
+        except Exception as e:
+            logging.error(f"Failed to create shared resource {name}: {e}")
+            resource = None
+        if resource is None:
+            _retry_at[name] = time.monotonic() + RESOURCE_RETRY_SECONDS
+            _status[name] = "failed"
+            logging.warning(f"Shared resource {name} unavailable; retrying in {RESOURCE_RETRY_SECONDS:.0f}s")
+            return None
+        _retry_at.pop(name, None)
+        _resources[name] = resource
+        _status[name] = "hot"
+        return resource
+
+def is_ready(name: str) -> bool:
+    return _resources.get(name) is not None
+
+def readiness() -> dict:
+    """Warm-up state of every registered resource: cold, warming, hot or failed."""
+    return {name: _status.get(name, "cold") for name in WARMUP_ORDER}
+
+# ----------------------------
+# Shared clients
+# ----------------------------
+def get_llm(wait: bool = True):
+    """Watsonx Granite LLM shared by main.py, helper.py and the agents."""
+    return get_or_create("llm", lambda: WatsonxLLM(
+        model_id=LLM_MODEL_ID,
+        url=url,
+        project_id=project_id,
+        apikey=api_key,
+        params={
+            "decoding_method": "greedy",
+            "temperature": 0.7,
+            "min_new_tokens": 5,
+            "max_new_tokens": 400,
+            "repetition_penalty": 1.2
+        }
+    ), wait=wait)
+
+def get_embeddings(wait: bool = True):
+    """
+    Embeddings shared by every vector store: Watsonx by default, or a local provider
+    selected with EMBEDDING_PROVIDER. Always behind the on-disk embedding cache so
+    identical text is only ever embedded once.
+    """
+    return get_or_create("embeddings", create_embeddings, wait=wait)
+
+# ----------------------------
+# Shared RAG tools (one collection per corpus in tools/corpora.json)
+# ----------------------------
+def _build_corpus_tool(name: str):
+    # A bundled snapshot has to be current before the first store is opened
+    load_snapshot_on_startup()
+    return build_corpus_tool(get_corpus(name), embeddings=get_embeddings())
+
+def get_corpus_tool(name: str, wait: bool = True):
+    return get_or_create(f"{name}_tool", lambda: _build_corpus_tool(name), wait=wait)
+
+def get_physical_activity_tool(wait: bool = True):
+    return get_corpus_tool("physical_activity", wait=wait)
+
+def get_nutrition_tool(wait: bool = True):
+    return get_corpus_tool("nutrition", wait=wait)
+
+# ----------------------------
+# Semantic router (only used when ROUTER_MODE=semantic)
+# ----------------------------
+def _build_semantic_router():
+    # Snapshots can carry the router centroids, so import one before computing them
+    load_snapshot_on_startup()
+    embeddings = get_embeddings()
+    if embeddings is None:
+        return None
+    return SemanticRouter(embeddings, model_id=embedding_provider_id(embeddings))
+
+def get_semantic_router(wait: bool = True):
+    return get_or_create("semantic_router", _build_semantic_router, wait=wait)
+
+# ----------------------------
+# Background warm-up
+# ----------------------------
+CORPUS_NAMES = [corpus["name"] for corpus in enabled_corpora()]
+
+WARMUP_ORDER = ["llm", "embeddings"] + [f"{name}_tool" for name in CORPUS_NAMES]
+if ROUTER_MODE == "semantic":
+    WARMUP_ORDER.insert(2, "semantic_router")
+
+_WARMUP_FACTORIES = {
+    "llm": get_llm,
+    "embeddings": get_embeddings,
+    "semantic_router": get_semantic_router,
+}
+for _name in CORPUS_NAMES:
+    _WARMUP_FACTORIES[f"{_name}_tool"] = lambda name=_name: get_corpus_tool(name)
+
+_warmup_thread = None
+
+def start_warmup():
+    """
+    Build every shared resource in a daemon thread so importing main.py never blocks
+    on Watsonx authentication, PDF parsing or embedding. Safe to call repeatedly.
+    """
+    global _warmup_thread
+    with _registry_lock:
+        if _warmup_thread is not None:
+            return _warmup_thread
+
+        def _warm():
+            load_snapshot_on_startup()
+            for name in WARMUP_ORDER:
+                _WARMUP_FACTORIES[name]()
+            logging.info(f"Warm-up finished: {readiness()}")
+
+        _warmup_thread = threading.Thread(target=_warm, name="resource-warmup", daemon=True)
+        _warmup_thread.start()
+        return _warmup_thread
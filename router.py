@@ -0,0 +1,290 @@
+# router.py
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from collections import Counter
+import numpy as np
+
+# ----------------------------
+# Keyword sets per routing category
+# ----------------------------
+PHYSICAL_KEYWORDS = [
+    "exercise", "physical activity", "fitness", "workout", "aerobic",
+    "strength", "endurance", "cardio", "movement", "sports", "training",
+    "walking", "running", "yoga", "stretching", "cycling", "swimming", "resistance"
+]
+
+NUTRITION_KEYWORDS = [
+    "nutrition", "nutritional", "diet", "dietary", "food", "nutrient", "protein", "carbohydrate", "fat",
+    "vitamin", "mineral", "fiber", "hydration", "balanced diet", "healthy eating",
+    "meal plan", "micronutrients", "macronutrients", "sodium", "cholesterol",
+    "sugar", "vegetables", "fruits", "whole grains", "dietary guideline"
+]
+
+GENERAL_HEALTH_KEYWORDS = [
+    "lifestyle", "sleep", "hydration", "stress", "mental health", "wellness"
+]
+
+CATEGORY_KEYWORDS = {
+    "physical_activity": PHYSICAL_KEYWORDS,
+    "nutrition": NUTRITION_KEYWORDS,
+    "general_health": GENERAL_HEALTH_KEYWORDS,
+}
+
+
+# Inflections and derived forms accepted after a keyword stem ("sleeping", "stressful",
+# "sugary", "sleepless", "strengthening", "whole grain")
+KEYWORD_SUFFIXES = ("s", "es", "ed", "ing", "y", "ful", "less", "en", "ens", "ened", "ening")
+
+# Unambiguous domain keywords that still match anywhere inside a longer word, as the
+# original substring matcher did ("cardiovascular", "lipoprotein", "seafood", "dietitian")
+SUBSTRING_KEYWORDS = (
+    "cardio", "vitamin", "protein", "cholesterol", "nutrient", "carbohydrate",
+    "food", "diet", "sugar", "sleep", "stress",
+)
+
+
+def keyword_stem(keyword: str) -> str:
+    """Keyword without a plural "s" or final "e", so every inflection can follow it."""
+    if keyword.endswith("s") and not keyword.endswith("ss"):
+        return keyword[:-1]
+    if keyword.endswith("e"):
+        return keyword[:-1]
+    return keyword
+
+
+def keyword_stems(keyword: str) -> list:
+    """
+    keyword_stem(), the keyword itself when that dropped a final "e" ("exercise"), and
+    the doubled final consonant of short words ("fat" -> "fatty", but not "fate").
+    """
+    stem = keyword_stem(keyword)
+    if keyword.endswith("e"):
+        return [stem, keyword]
+    if re.search(r"(?:^|\s)[^aeiou\s][aeiou][b-df-hj-np-tv-z]$", stem):
+        return [stem, stem + stem[-1]]
+    return [stem]
+
+
+class KeywordRouter:
+    """
+    Matches every keyword set in a single regex pass.
+    Keywords match on word boundaries (so "fat" no longer fires on "fatigue"),
+    in singular, plural, inflected or derived forms ("exercising", "stressful",
+    "fatty"), with any whitespace between words. SUBSTRING_KEYWORDS also match
+    inside longer words.
+    """
+
+    def __init__(self, category_keywords: dict):
+        self.categories = list(category_keywords)
+        self._keyword_categories = {}
+        self._stem_keywords = {}
+        for category, keywords in category_keywords.items():
+            for kw in keywords:
+                self._keyword_categories.setdefault(kw.lower(), []).append(category)
+                stems = [kw.lower()] if kw.lower() in SUBSTRING_KEYWORDS else keyword_stems(kw.lower())
+                for stem in stems:
+                    self._stem_keywords.setdefault(stem, kw.lower())
+
+        def alternation(stems):
+            # Longest first so "balanced diet" wins over "diet"
+            stems = sorted(stems, key=len, reverse=True)
+            return "|".join(re.escape(stem).replace(r"\ ", r"\s+") for stem in stems) or "(?!)"
+
+        words = alternation(stem for stem in self._stem_keywords if stem not in SUBSTRING_KEYWORDS)
+        substrings = alternation(stem for stem in self._stem_keywords if stem in SUBSTRING_KEYWORDS)
+        suffixes = "|".join(KEYWORD_SUFFIXES)
+        self._pattern = re.compile(rf"\b(?:({words})(?:{suffixes})?|\w*?({substrings})\w*)\b", re.IGNORECASE)
+
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def match(self, query: str) -> dict:
+        """
+        Return {category: [matched keywords in order of appearance]} for every category hit.
+        Does not touch the routing counters, so the agents can use it to pick keywords.
+        """
+        matches = {}
+        for m in self._pattern.finditer(query or ""):
+            keyword = self._stem_keywords[re.sub(r"\s+", " ", (m.group(1) or m.group(2)).lower())]
+            for category in self._keyword_categories[keyword]:
+                found = matches.setdefault(category, [])
+                if keyword not in found:
+                    found.append(keyword)
+        return matches
+
+    def route(self, query: str) -> dict:
+        """match() for a routing decision, counted in stats()."""
+        matches = self.match(query)
+        with self._lock:
+            self._counts["queries"] += 1
+            self._counts.update(matches.keys())
+            if not matches:
+                self._counts["unmatched"] += 1
+        return matches
+
+    def stats(self) -> dict:
+        """Per-category match counters since process start."""
+        with self._lock:
+            stats = {category: self._counts[category] for category in self.categories}
+            stats["unmatched"] = self._counts["unmatched"]
+            stats["queries"] = self._counts["queries"]
+        return stats
+
+
+# Shared router used by main.py and the agents
+keyword_router = KeywordRouter(CATEGORY_KEYWORDS)
+
+def match_categories(query: str) -> dict:
+    """Matched keywords per category, without counting the query as routed."""
+    return keyword_router.match(query)
+
+def is_physical_activity_query(query: str) -> bool:
+    return "physical_activity" in keyword_router.match(query)
+
+def is_nutrition_query(query: str) -> bool:
+    return "nutrition" in keyword_router.match(query)
+
+def is_general_health_query(query: str) -> bool:
+    return "general_health" in keyword_router.match(query)
+
+
+# ----------------------------
+# Semantic routing
+# ----------------------------
+ROUTER_MODE = os.getenv("ROUTER_MODE", "keyword")  # "keyword" or "semantic"
+SEMANTIC_THRESHOLD = float(os.getenv("SEMANTIC_ROUTER_THRESHOLD", 0.55))
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+CENTROIDS_PATH = os.path.join(this_dir, "data", "router_centroids.npz")
+
+SEED_PHRASES = {
+    "physical_activity": [
+        "how much exercise should I get each week",
+        "how many steps a day should I walk",
+        "what is a good workout routine for beginners",
+        "is jogging or swimming better for my heart",
+        "how can I build muscle strength at home",
+        "how long should I stretch before running",
+        "how active should older adults be",
+        "what counts as moderate intensity activity",
+    ],
+    "nutrition": [
+        "what should I eat to lose weight",
+        "how much protein do I need per day",
+        "is it healthy to skip breakfast",
+        "which foods are high in fiber",
+        "how much salt is too much",
+        "what is a healthy meal plan for a week",
+        "are eggs bad for cholesterol",
+        "how many servings of vegetables a day",
+    ],
+    "general_health": [
+        "how many hours of sleep do adults need",
+        "how can I manage stress and anxiety",
+        "tips for a healthier lifestyle",
+        "how do I improve my mental health",
+        "how much water should I drink",
+        "how can I stop feeling tired all the time",
+        "what are good habits for overall wellness",
+        "how can I quit smoking",
+    ],
+}
+
+
+class SemanticRouter:
+    """
+    Classifies a query by cosine similarity against one centroid per category.
+    Centroids are the normalized mean of the seed phrase embeddings, computed once
+    and saved as a small NumPy array; classifying is one matrix-vector product.
+    """
+
+    def __init__(self, embeddings, seed_phrases=SEED_PHRASES, threshold=SEMANTIC_THRESHOLD,
+                 cache_path=CENTROIDS_PATH, model_id=""):
+        self.embeddings = embeddings
+        self.seed_phrases = seed_phrases
+        self.threshold = threshold
+        self.cache_path = cache_path
+        self.categories = list(seed_phrases)
+        self._fingerprint = hashlib.sha256(
+            json.dumps([model_id, seed_phrases], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        self.centroids = self._load_or_build()
+
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _load_or_build(self) -> np.ndarray:
+        if os.path.exists(self.cache_path):
+            try:
+                with np.load(self.cache_path) as cached:
+                    if str(cached["fingerprint"]) == self._fingerprint:
+                        logging.info(f"Loaded router centroids from: {self.cache_path}")
+                        return cached["centroids"]
+            except Exception as e:
+                logging.warning(f"Ignoring unreadable router centroids ({self.cache_path}): {e}")
+
+        logging.info("Computing router centroids from seed phrases...")
+        phrases = [p for category in self.categories for p in self.seed_phrases[category]]
+        vectors = self._normalize(np.asarray(self.embeddings.embed_documents(phrases), dtype=np.float32))
+
+        centroids, start = [], 0
+        for category in self.categories:
+            end = start + len(self.seed_phrases[category])
+            centroids.append(vectors[start:end].mean(axis=0))
+            start = end
+        centroids = self._normalize(np.stack(centroids)).astype(np.float32)
+
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            np.savez(self.cache_path, centroids=centroids, fingerprint=np.array(self._fingerprint))
+        except OSError as e:
+            logging.warning(f"Could not save router centroids: {e}")
+        return centroids
+
+    def classify(self, query: str) -> dict:
+        """
+        Return {category: similarity} for the best category, or {} when its
+        similarity is below the confidence threshold.
+        """
+        query_vector = self._normalize(np.asarray(self.embeddings.embed_query(query), dtype=np.float32))
+        scores = self.centroids @ query_vector
+        best = int(np.argmax(scores))
+
+        with self._lock:
+            self._counts["queries"] += 1
+            if scores[best] < self.threshold:
+                self._counts["below_threshold"] += 1
+                return {}
+            self._counts[self.categories[best]] += 1
+        return {self.categories[best]: float(scores[best])}
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {category: self._counts[category] for category in self.categories}
+            stats["below_threshold"] = self._counts["below_threshold"]
+            stats["queries"] = self._counts["queries"]
+        return stats
+
+
+def route_categories(query: str, semantic_router=None) -> dict:
+    """
+    Categories for a query. Uses the semantic router when one is given and it is
+    confident, otherwise falls back to keyword matching.
+    """
+    if semantic_router is not None:
+        try:
+            categories = semantic_router.classify(query)
+            if categories:
+                return categories
+        except Exception as e:
+            logging.warning(f"Semantic routing failed, using keywords: {e}")
+    return keyword_router.route(query)
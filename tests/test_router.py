@@ -0,0 +1,91 @@
+# tests/test_router.py
+import pytest
+from router import CATEGORY_KEYWORDS, KeywordRouter
+
+# Queries the original substring matcher routed; the keyword router must route them too
+BASELINE_QUERIES = [
+    "nutritional advice",
+    "dietary advice",
+    "sleeping badly",
+    "stressed out",
+    "how much protein is in eggs",
+    "balanced diets for teenagers",
+    "meal plans for the week",
+    "what vitamins should I take",
+    "is sugar bad for me",
+    "how to lower cholesterol",
+    "cycling to work every day",
+    "a workout for beginners",
+    "I love sports",
+    "stretching before running",
+    "mental health tips",
+    "lifestyle changes after 40",
+    "drink more water for hydration",
+    "improving my fitness",
+    # Derived forms and compounds seen in real questions
+    "fatty acids",
+    "sugary drinks",
+    "stressful job",
+    "sleepless nights",
+    "cardiovascular health",
+    "strengthening exercises",
+    "fruity snacks",
+    "seafood twice a week",
+    "lipoprotein levels",
+    "do I need multivitamins",
+    "should I see a dietitian",
+    "common stressors at work",
+    "daytime sleepiness",
+    "hypercholesterolemia and diet",
+] + [f"tell me about {keyword}" for keywords in CATEGORY_KEYWORDS.values() for keyword in keywords]
+
+# Substring hits inside unrelated words that the word-boundary match drops on purpose.
+# These are the only drops relative to the original substring matcher that are intended.
+INTENDED_MISSES = {
+    "I feel fatigue": {"nutrition"},
+    "a fatal mistake": {"nutrition"},
+    "tempting fate": {"nutrition"},
+    "public transports": {"physical_activity"},
+    "a restraining order": {"physical_activity"},
+}
+
+
+def baseline_categories(query: str) -> set:
+    return {category for category, keywords in CATEGORY_KEYWORDS.items()
+            if any(keyword in query.lower() for keyword in keywords)}
+
+
+@pytest.mark.parametrize("query", BASELINE_QUERIES)
+def test_keeps_baseline_hits(query):
+    assert baseline_categories(query) <= set(KeywordRouter(CATEGORY_KEYWORDS).match(query))
+
+
+@pytest.mark.parametrize("query", ["whole grain bread", "exercising daily", "fruit salad"])
+def test_matches_inflected_keywords(query):
+    assert KeywordRouter(CATEGORY_KEYWORDS).match(query)
+
+
+@pytest.mark.parametrize("query,keyword", [
+    ("strengthening exercises", "strength"),
+    ("fatty acids", "fat"),
+    ("cardiovascular health", "cardio"),
+    ("sleepless nights", "sleep"),
+])
+def test_derived_forms_hit_their_keyword(query, keyword):
+    assert any(keyword in found for found in KeywordRouter(CATEGORY_KEYWORDS).match(query).values())
+
+
+@pytest.mark.parametrize("query,dropped", INTENDED_MISSES.items())
+def test_word_boundaries(query, dropped):
+    assert not dropped & set(KeywordRouter(CATEGORY_KEYWORDS).match(query))
+
+
+def test_only_route_is_counted():
+    router = KeywordRouter(CATEGORY_KEYWORDS)
+    router.match("how much protein")
+    router.route("how much protein")
+    router.route("hello")
+    stats = router.stats()
+    assert stats["queries"] == 2
+    assert stats["nutrition"] == 1
+    assert stats["unmatched"] == 1
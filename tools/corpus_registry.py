@@ -0,0 +1,340 @@
+# tools/corpus_registry.py
+import os
+import re
+import json
+import shutil
+import logging
+import tempfile
+import threading
+import chromadb
+from langchain.tools import BaseTool
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from embedding_providers import DEFAULT_PROVIDER_ID, create_embeddings, embedding_provider_id
+from tools.ingestion import sync_collection, save_manifest, load_manifest
+from tools.pdf_extract import load_pdf_pages
+from tools.retrieval_cache import RetrievalCache
+from tools.hybrid_retrieval import HybridSearcher, ensure_bm25_index
+from tools.flat_store import FlatVectorStore
+
+# ----------------------------
+# Configuration
+# ----------------------------
+this_dir = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.normpath(os.path.join(this_dir, ".."))
+
+CORPORA_PATH = os.getenv("CORPORA_CONFIG", os.path.join(this_dir, "corpora.json"))
+DATA_DIR = os.path.join(ROOT_DIR, "data")
+# Per-tool stores from before the shared client; only read, to migrate them
+LEGACY_CHROMA_DIR = os.path.join(DATA_DIR, "chroma_store")
+# Imported snapshots live in data/stores/<snapshot id>/, "current" links to the live one
+SNAPSHOT_STORES_DIR = os.path.join(DATA_DIR, "stores")
+CURRENT_STORE_LINK = os.path.join(SNAPSHOT_STORES_DIR, "current")
+
+# "chroma" (shared persistent client) or "flat" (memory-mapped quantized matrix)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+
+
+def load_text_file(file_path: str):
+    with open(file_path, "r", encoding="utf-8") as f:
+        return [Document(page_content=f.read(), metadata={"source": file_path})]
+
+LOADERS = {
+    "pdf": load_pdf_pages,
+    "text": load_text_file,
+}
+
+# ----------------------------
+# Corpus configuration
+# ----------------------------
+def load_corpora(path: str = CORPORA_PATH) -> list:
+    """
+    Every corpus declared in corpora.json:
+    {"name", "enabled", "collection", "sources", "loader", "chunk_size", "chunk_overlap",
+     "separators" (optional), "k", "retrieval" ("hybrid" or "similarity"),
+     "fetch_k", "mmr", "mmr_lambda", "dedup_threshold" (optional reranking settings),
+     "backend" (optional, "chroma" or "flat"; defaults to VECTOR_BACKEND),
+     "tool_name", "description", "empty_message",
+     "agent_name" / "agent_description" (optional, for corpora without a dedicated agent)}
+    Source paths are relative to the project root.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["corpora"]
+
+def enabled_corpora() -> list:
+    return [corpus for corpus in load_corpora() if corpus.get("enabled", True)]
+
+def get_corpus(name: str) -> dict:
+    for corpus in load_corpora():
+        if corpus["name"] == name:
+            return corpus
+    raise KeyError(f"Unknown corpus: {name}")
+
+_store_root = None
+
+def store_root() -> str:
+    """
+    Directory holding chroma_store/ and flat_store/: the imported snapshot if there
+    is one, else data/. Resolved once per process so a snapshot swapped in later
+    never mixes with stores that are already open.
+    """
+    global _store_root
+    if _store_root is None:
+        _store_root = os.path.realpath(CURRENT_STORE_LINK) if os.path.isdir(CURRENT_STORE_LINK) else DATA_DIR
+    return _store_root
+
+def chroma_directory(root: str = None) -> str:
+    return os.path.join(root or store_root(), "chroma_store")
+
+def flat_directory(collection_name: str, root: str = None) -> str:
+    return os.path.join(root or store_root(), "flat_store", collection_name)
+
+def manifest_directory(collection_name: str, backend: str = "chroma", root: str = None) -> str:
+    """Where a collection's manifest and BM25 index live; flat stores keep them alongside the vectors."""
+    if backend == "flat":
+        return flat_directory(collection_name, root)
+    return os.path.join(chroma_directory(root), "manifests", collection_name)
+
+def collection_for(corpus: dict, provider: str = None) -> str:
+    """
+    Collection holding a corpus for an embedding provider. The default (Watsonx)
+    provider uses the configured name; other providers get their own collection
+    so local and remote embeddings can be compared side by side.
+    """
+    if provider is None or provider == DEFAULT_PROVIDER_ID:
+        return corpus["collection"]
+    return f"{corpus['collection']}--{re.sub(r'[^A-Za-z0-9._-]+', '-', provider).strip('-')}"
+
+# ----------------------------
+# Shared Chroma client
+# ----------------------------
+_client = None
+_client_lock = threading.Lock()
+
+def get_chroma_client():
+    """One persistent Chroma client for every collection in the process."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            os.makedirs(chroma_directory(), exist_ok=True)
+            logging.info(f"Opening shared Chroma store at: {chroma_directory()}")
+            _client = chromadb.PersistentClient(path=chroma_directory())
+        return _client
+
+def _migrate_legacy_store(client, collection_name: str) -> None:
+    """
+    Copy a collection out of its old per-tool store (data/chroma_store/<collection>/)
+    into the shared store the first time the shared collection is opened empty.
+    The legacy store is read from a temporary copy so the original is left untouched.
+    """
+    legacy_dir = os.path.join(LEGACY_CHROMA_DIR, collection_name)
+    if not os.path.exists(os.path.join(legacy_dir, "chroma.sqlite3")):
+        return
+    target = client.get_or_create_collection(collection_name, embedding_function=None)
+    if target.count():
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        legacy_copy = os.path.join(tmp_dir, collection_name)
+        shutil.copytree(legacy_dir, legacy_copy)
+        try:
+            legacy = chromadb.PersistentClient(path=legacy_copy).get_collection(collection_name)
+        except Exception as e:
+            logging.warning(f"No legacy collection {collection_name} to migrate: {e}")
+            return
+
+        total = legacy.count()
+        logging.info(f"Migrating {total} chunks of {collection_name} into the shared store")
+        for offset in range(0, total, 500):
+            batch = legacy.get(include=["embeddings", "documents", "metadatas"], limit=500, offset=offset)
+            target.add(
+                ids=batch["ids"],
+                embeddings=batch["embeddings"],
+                documents=batch["documents"],
+                metadatas=batch["metadatas"],
+            )
+
+    legacy_manifest = load_manifest(legacy_dir)
+    if legacy_manifest["sources"] and not load_manifest(manifest_directory(collection_name))["sources"]:
+        save_manifest(manifest_directory(collection_name), legacy_manifest)
+
+def _open_chroma(collection_name: str, embeddings):
+    client = get_chroma_client()
+    _migrate_legacy_store(client, collection_name)
+    return Chroma(
+        client=client,
+        collection_name=collection_name,
+        embedding_function=embeddings
+    )
+
+def _open_flat(collection_name: str, embeddings):
+    """
+    Open a flat store. An empty one is seeded once from the Chroma collection of the
+    same name (if it has chunks), so existing collections switch backend without
+    re-embedding.
+    """
+    store = FlatVectorStore(flat_directory(collection_name), embedding_function=embeddings)
+    if store.count():
+        return store
+
+    chroma = _open_chroma(collection_name, embeddings)
+    total = chroma._collection.count()
+    if total:
+        logging.info(f"Seeding flat store {collection_name} with {total} chunks from Chroma")
+        stored = chroma._collection.get(include=["embeddings", "documents", "metadatas"])
+        store.upsert(stored["ids"], stored["embeddings"], stored["documents"], stored["metadatas"])
+        manifest = load_manifest(manifest_directory(collection_name))
+        if manifest["sources"] or manifest.get("embedding_provider"):
+            save_manifest(manifest_directory(collection_name, "flat"), manifest)
+    return store
+
+def _open_corpus(corpus: dict, embeddings=None):
+    """
+    Open the corpus collection in its vector backend, sync it against its sources and
+    bring its BM25 index up to date.
+    Returns (vectorstore, BM25 index or None, manifest directory).
+    """
+    if embeddings is None:
+        embeddings = create_embeddings()
+
+    backend = corpus.get("backend", VECTOR_BACKEND)
+    provider = embedding_provider_id(embeddings)
+    collection_name = collection_for(corpus, provider)
+    if backend == "flat":
+        vectorstore = _open_flat(collection_name, embeddings)
+    elif backend == "chroma":
+        vectorstore = _open_chroma(collection_name, embeddings)
+    else:
+        raise ValueError(f"Unknown vector backend: {backend}")
+    manifest_dir = manifest_directory(collection_name, backend)
+
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=corpus["chunk_size"],
+        chunk_overlap=corpus["chunk_overlap"],
+        **({"separators": corpus["separators"]} if corpus.get("separators") else {})
+    )
+    manifest = sync_collection(
+        vectorstore,
+        collection_name,
+        manifest_dir,
+        [os.path.join(ROOT_DIR, source) for source in corpus["sources"]],
+        load_documents=LOADERS[corpus.get("loader", "pdf")],
+        text_splitter=text_splitter,
+        embedding_provider=provider,
+    )
+
+    bm25 = None
+    if corpus.get("retrieval", "hybrid") == "hybrid":
+        bm25 = ensure_bm25_index(vectorstore, manifest_dir, manifest.get("version", 0))
+    return vectorstore, bm25, manifest_dir
+
+def build_vectorstore(corpus: dict, embeddings=None):
+    """Open the corpus collection in its vector backend and sync it against its sources."""
+    return _open_corpus(corpus, embeddings)[0]
+
+# ----------------------------
+# Generic retrieval tool
+# ----------------------------
+def build_corpus_tool(corpus: dict, embeddings=None):
+    """
+    Build a LangChain retrieval tool for one corpus from its registry entry.
+    Returns None if the collection can't be opened or synced.
+    """
+    try:
+        if embeddings is None:
+            embeddings = create_embeddings()
+        vectorstore, bm25, manifest_dir = _open_corpus(corpus, embeddings)
+
+        k = corpus.get("k", 3)
+        label = corpus["name"]
+        empty_message = corpus["empty_message"]
+        # Over-fetch (fusing BM25 when enabled), drop near-duplicates, then MMR down to k
+        searcher = HybridSearcher(
+            vectorstore, embeddings, bm25, k=k,
+            candidates=corpus.get("fetch_k"),
+            mmr=corpus.get("mmr", True),
+            mmr_lambda=corpus.get("mmr_lambda", 0.7),
+            dedup_threshold=corpus.get("dedup_threshold", 0.5),
+            # Picks up BM25 indexes rebuilt by another process along with the vectors
+            bm25_directory=manifest_dir if bm25 is not None else None,
+        )
+
+        # Keyword queries repeat a lot; cached results are dropped when the collection is re-indexed
+        retrieval_cache = RetrievalCache(manifest_dir)
+
+        def _format(docs) -> str:
+            if docs is None:
+                return "Retriever is not available."
+            if not docs:
+                return empty_message
+            return "\n\n".join([getattr(d, "page_content", str(d)) for d in docs])
+
+        class CorpusTool(BaseTool):
+            name: str = corpus["tool_name"]
+            description: str = corpus["description"]
+
+            def _run(self, query: str) -> str:
+                docs = retrieval_cache.get(query)
+                if docs is None:
+                    try:
+                        docs = searcher.search(query)
+                    except Exception as e:
+                        logging.error(f"{label} retrieval failed: {e}")
+                        return "Retriever is not available."
+                    retrieval_cache.set(query, docs)
+                return _format(docs)
+
+            async def _arun(self, query: str) -> str:
+                # Only the query embedding goes over the network; the vector lookup is local
+                docs = retrieval_cache.get(query)
+                if docs is None:
+                    try:
+                        docs = await searcher.asearch(query)
+                    except Exception as e:
+                        logging.error(f"Async {label} retrieval failed: {e}")
+                        return "Retriever is not available."
+                    retrieval_cache.set(query, docs)
+                return _format(docs)
+
+            def batch_run(self, queries) -> list:
+                """
+                Tool output for each query, resolving every uncached query with one
+                embedding request and one batched search.
+                """
+                queries = list(queries)
+                docs_per_query = [retrieval_cache.get(query) for query in queries]
+                misses = [i for i, docs in enumerate(docs_per_query) if docs is None]
+                if misses:
+                    try:
+                        fetched = searcher.search_batch([queries[i] for i in misses])
+                    except Exception as e:
+                        logging.error(f"Batch {label} retrieval failed: {e}")
+                        fetched = [None] * len(misses)
+                    for i, docs in zip(misses, fetched):
+                        docs_per_query[i] = docs
+                        if docs is not None:
+                            retrieval_cache.set(queries[i], docs)
+                return [_format(docs) for docs in docs_per_query]
+
+            async def abatch_run(self, queries) -> list:
+                queries = list(queries)
+                docs_per_query = [retrieval_cache.get(query) for query in queries]
+                misses = [i for i, docs in enumerate(docs_per_query) if docs is None]
+                if misses:
+                    try:
+                        fetched = await searcher.asearch_batch([queries[i] for i in misses])
+                    except Exception as e:
+                        logging.error(f"Async batch {label} retrieval failed: {e}")
+                        fetched = [None] * len(misses)
+                    for i, docs in zip(misses, fetched):
+                        docs_per_query[i] = docs
+                        if docs is not None:
+                            retrieval_cache.set(queries[i], docs)
+                return [_format(docs) for docs in docs_per_query]
+
+        return CorpusTool()
+
+    except Exception as e:
+        logging.error(f"Failed to build {corpus.get('name')} RAG tool: {e}")
+        return None
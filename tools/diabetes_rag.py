@@ -0,0 +1,9 @@
+# tools/diabetes_rag.py
+from tools.corpus_registry import build_corpus_tool, get_corpus
+
+def build_diabetes_rag(embeddings=None):
+    """
+    Build the Diabetes Retrieval Tool. The corpus is declared (disabled until its
+    source PDF is added) in tools/corpora.json.
+    """
+    return build_corpus_tool(get_corpus("diabetes"), embeddings=embeddings)
@@ -0,0 +1,375 @@
+# tools/flat_store.py
+import os
+import json
+import fcntl
+import shutil
+import hashlib
+import logging
+import threading
+from typing import NamedTuple
+from contextlib import contextmanager
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+FLAT_DTYPE = os.getenv("FLAT_STORE_DTYPE", "int8")  # "int8" or "float16"
+FLAT_RESCORE = os.getenv("FLAT_STORE_RESCORE", "1") == "1"
+RESCORE_FACTOR = 4
+# Rows of the quantized matrix upcast to float32 at a time while scoring
+SCORE_BLOCK_ROWS = 16384
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class _FlatCollection:
+    """
+    The subset of the chromadb Collection API used by tools/ingestion.py and
+    tools/hybrid_retrieval.py (count, get, upsert, delete), over a FlatVectorStore.
+    """
+
+    def __init__(self, store):
+        self._store = store
+
+    def count(self) -> int:
+        return self._store.count()
+
+    def get(self, ids=None, include=("documents", "metadatas"), limit=None, offset=None):
+        return self._store.get(ids=ids, include=include, limit=limit, offset=offset)
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        self._store.upsert(ids, embeddings, documents, metadatas)
+
+    def delete(self, ids=None):
+        self._store.delete(ids)
+
+
+class _Generation(NamedTuple):
+    """Everything read from one generation; replaced as a whole, never mutated."""
+    meta: dict
+    ids: list
+    documents: list
+    metadatas: list
+    positions: dict
+    quantized: object = None  # memmaps, None when the generation is empty
+    scales: object = None
+    full: object = None
+
+
+class FlatVectorStore(VectorStore):
+    """
+    Exact cosine search over a flat matrix of normalized embeddings.
+
+    Each write produces a new immutable generation directory holding the chunk
+    records and the vectors quantized to int8 (with per-row scales) or float16, plus
+    a float32 copy used only to rescore the top candidates. meta.json names the live
+    generation and is swapped atomically, so any number of processes can memory-map
+    the same files (sharing the OS page cache) and pick up a rebuild on their next
+    query. Search is one pass of matrix products over row blocks of the quantized matrix.
+    Every write rewrites the whole generation, which suits corpora of a few
+    thousand chunks; writes made inside bulk() share one generation. Writers in
+    every process serialize on an flock of write.lock and apply their changes to
+    whatever generation is live when they get it.
+    """
+
+    def __init__(self, directory: str, embedding_function=None, dtype: str = FLAT_DTYPE, rescore: bool = FLAT_RESCORE):
+        self.directory = directory
+        self._embedding_function = embedding_function
+        self.dtype = dtype
+        self.rescore = rescore
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._meta_mtime = None
+        self._pending = None  # upserts/deletes recorded inside bulk()
+        self._generation = _Generation({"generation": 0, "count": 0, "dim": 0, "dtype": dtype}, [], [], [], {})
+        self._collection = _FlatCollection(self)
+        os.makedirs(directory, exist_ok=True)
+        self._refresh()
+
+    @property
+    def embeddings(self):
+        return self._embedding_function
+
+    # ----------------------------
+    # Loading
+    # ----------------------------
+    def _meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    def _write_lock_path(self) -> str:
+        return os.path.join(self.directory, "write.lock")
+
+    def _generation_dir(self, generation: int) -> str:
+        return os.path.join(self.directory, f"gen-{generation:06d}")
+
+    def _refresh(self, force: bool = False) -> None:
+        """Re-open the live generation if meta.json changed since it was last read (or always, with force)."""
+        try:
+            mtime = os.stat(self._meta_path()).st_mtime_ns
+        except OSError:
+            return
+        with self._lock:
+            if mtime == self._meta_mtime and not force:
+                return
+            with open(self._meta_path(), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            gen_dir = self._generation_dir(meta["generation"])
+            with open(os.path.join(gen_dir, "records.json"), "r", encoding="utf-8") as f:
+                records = json.load(f)
+
+            count, dim = meta["count"], meta["dim"]
+            quantized = scales = full = None
+            if count:
+                quantized = np.memmap(os.path.join(gen_dir, "vectors.q"), dtype=meta["dtype"], mode="r", shape=(count, dim))
+                if meta["dtype"] == "int8":
+                    scales = np.memmap(os.path.join(gen_dir, "scales.f32"), dtype=np.float32, mode="r", shape=(count,))
+                if os.path.exists(os.path.join(gen_dir, "vectors.f32")):
+                    full = np.memmap(os.path.join(gen_dir, "vectors.f32"), dtype=np.float32, mode="r", shape=(count, dim))
+
+            ids = records["ids"]
+            self._generation = _Generation(meta, ids, records["documents"], records["metadatas"],
+                                           {doc_id: i for i, doc_id in enumerate(ids)}, quantized, scales, full)
+            self._meta_mtime = mtime
+
+    def _current(self) -> _Generation:
+        """The live generation. Callers use only this snapshot, so a concurrent refresh can't mix generations."""
+        self._refresh()
+        with self._lock:
+            return self._generation
+
+    @staticmethod
+    def _full_vectors(gen: _Generation, positions) -> np.ndarray:
+        """Float32 rows for the given positions (dequantized if no float32 copy is stored)."""
+        if gen.full is not None:
+            return np.asarray(gen.full[positions], dtype=np.float32)
+        rows = np.asarray(gen.quantized[positions], dtype=np.float32)
+        if gen.scales is not None:
+            rows *= np.asarray(gen.scales[positions])[:, None]
+        return rows
+
+    # ----------------------------
+    # Writing (one new generation per call, or per bulk() block)
+    # ----------------------------
+    @contextmanager
+    def _exclusive_write(self):
+        """Serialize writers in this process (thread lock) and across processes (flock)."""
+        with self._write_lock, open(self._write_lock_path(), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write(self, ids, documents, metadatas, vectors: np.ndarray) -> None:
+        # Called under _exclusive_write(), so picking the generation, writing it,
+        # swapping meta.json and cleaning up happen as one step across processes
+        generation = self._generation.meta["generation"] + 1
+        gen_dir = self._generation_dir(generation)
+        shutil.rmtree(gen_dir, ignore_errors=True)
+        os.makedirs(gen_dir)
+
+        dim = int(vectors.shape[1]) if len(ids) else self._generation.meta["dim"]
+        if len(ids):
+            vectors = _normalize(vectors.astype(np.float32))
+            if self.dtype == "int8":
+                scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+                np.round(vectors / scales[:, None]).astype(np.int8).tofile(os.path.join(gen_dir, "vectors.q"))
+                scales.astype(np.float32).tofile(os.path.join(gen_dir, "scales.f32"))
+            else:
+                vectors.astype(np.float16).tofile(os.path.join(gen_dir, "vectors.q"))
+            if self.rescore:
+                vectors.tofile(os.path.join(gen_dir, "vectors.f32"))
+        with open(os.path.join(gen_dir, "records.json"), "w", encoding="utf-8") as f:
+            json.dump({"ids": list(ids), "documents": list(documents), "metadatas": list(metadatas)}, f)
+
+        meta = {"generation": generation, "count": len(ids), "dim": dim, "dtype": self.dtype}
+        tmp_path = f"{self._meta_path()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path())
+
+        # Earlier generations stay readable by processes that still have them mapped
+        for name in os.listdir(self.directory):
+            if name.startswith("gen-") and name < f"gen-{generation - 1:06d}":
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+        logging.info(f"Wrote flat store generation {generation} ({len(ids)} chunks): {self.directory}")
+        self._refresh(force=True)
+
+    def _working_copy(self) -> dict:
+        """Editable copy of the live generation's records and float32 vectors."""
+        gen = self._current()
+        vectors = list(self._full_vectors(gen, np.arange(len(gen.ids)))) if gen.ids else []
+        return {"ids": list(gen.ids), "documents": list(gen.documents), "metadatas": list(gen.metadatas),
+                "vectors": vectors, "positions": dict(gen.positions), "dim": gen.meta["dim"], "dirty": False}
+
+    def _commit(self, ops: list) -> None:
+        """Replay recorded upserts and deletes onto the live generation and write the result."""
+        with self._exclusive_write():
+            # Re-read under the lock: another process may have written since this one last looked
+            self._refresh(force=True)
+            state = self._working_copy()
+            for apply, args in ops:
+                apply(state, *args)
+            if not state["dirty"]:
+                return
+            if state["vectors"]:
+                vectors = np.asarray(state["vectors"], dtype=np.float32)
+            else:
+                vectors = np.zeros((0, state["dim"]), dtype=np.float32)
+            self._write(state["ids"], state["documents"], state["metadatas"], vectors)
+
+    @contextmanager
+    def bulk(self):
+        """
+        Collect every upsert and delete made inside the block and write them as one
+        generation when it exits, instead of one generation per call. The block's
+        writes are committed even if it exits with an error, so finished batches are
+        kept for a resumed build.
+        """
+        if self._pending is not None:
+            yield self
+            return
+        self._pending = []
+        try:
+            yield self
+        finally:
+            ops, self._pending = self._pending, None
+            if ops:
+                self._commit(ops)
+
+    @staticmethod
+    def _apply_upsert(state: dict, ids, embeddings, documents, metadatas) -> None:
+        documents = documents or [""] * len(ids)
+        metadatas = metadatas or [{}] * len(ids)
+        positions = state["positions"]
+        for doc_id, vector, text, metadata in zip(ids, embeddings, documents, metadatas):
+            vector = np.asarray(vector, dtype=np.float32)
+            if doc_id in positions:
+                i = positions[doc_id]
+                state["documents"][i], state["metadatas"][i], state["vectors"][i] = text, metadata or {}, vector
+            else:
+                positions[doc_id] = len(state["ids"])
+                state["ids"].append(doc_id)
+                state["documents"].append(text)
+                state["metadatas"].append(metadata or {})
+                state["vectors"].append(vector)
+            state["dim"], state["dirty"] = len(vector), True
+
+    @staticmethod
+    def _apply_delete(state: dict, ids) -> None:
+        drop = set(ids or [])
+        keep = [i for i, doc_id in enumerate(state["ids"]) if doc_id not in drop]
+        if len(keep) == len(state["ids"]):
+            return
+        for key in ("ids", "documents", "metadatas", "vectors"):
+            state[key] = [state[key][i] for i in keep]
+        state["positions"] = {doc_id: i for i, doc_id in enumerate(state["ids"])}
+        state["dirty"] = True
+
+    def _record(self, apply, *args) -> None:
+        if self._pending is not None:
+            self._pending.append((apply, args))
+        else:
+            self._commit([(apply, args)])
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None) -> None:
+        self._record(self._apply_upsert, list(ids), embeddings, documents, metadatas)
+
+    def delete(self, ids=None, **kwargs) -> None:
+        self._record(self._apply_delete, list(ids or []))
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        ids = list(ids) if ids else [hashlib.sha256(text.encode("utf-8")).hexdigest() for text in texts]
+        self.upsert(ids, self._embedding_function.embed_documents(texts), texts, metadatas)
+        return ids
+
+    # ----------------------------
+    # Reading
+    # ----------------------------
+    def count(self) -> int:
+        return len(self._current().ids)
+
+    def get(self, ids=None, include=("documents", "metadatas"), limit=None, offset=None, **kwargs) -> dict:
+        gen = self._current()
+        if ids is None:
+            positions = list(range(len(gen.ids)))[offset or 0:]
+            positions = positions[:limit] if limit else positions
+        else:
+            positions = [gen.positions[doc_id] for doc_id in ids if doc_id in gen.positions]
+        result = {"ids": [gen.ids[i] for i in positions]}
+        if "documents" in include:
+            result["documents"] = [gen.documents[i] for i in positions]
+        if "metadatas" in include:
+            result["metadatas"] = [gen.metadatas[i] for i in positions]
+        if "embeddings" in include:
+            result["embeddings"] = self._full_vectors(gen, positions) if positions else []
+        return result
+
+    @staticmethod
+    def _approximate_scores(gen: _Generation, queries: np.ndarray) -> np.ndarray:
+        """
+        (rows, queries) scores against the quantized matrix, upcasting SCORE_BLOCK_ROWS
+        rows at a time so the whole matrix is never materialized in float32.
+        """
+        scores = np.empty((len(gen.ids), len(queries)), dtype=np.float32)
+        for start in range(0, len(gen.ids), SCORE_BLOCK_ROWS):
+            end = start + SCORE_BLOCK_ROWS
+            scores[start:end] = np.asarray(gen.quantized[start:end], dtype=np.float32) @ queries.T
+        if gen.scales is not None:
+            scores *= np.asarray(gen.scales)[:, None]
+        return scores
+
+    def _top_k(self, gen: _Generation, query: np.ndarray, scores: np.ndarray, k: int) -> list:
+        """Top-k (document, score) pairs from one query's approximate scores over the quantized matrix."""
+        # Approximate top candidates from the quantized matrix, then exact float32 scores for those only
+        n_candidates = min(len(scores), k * RESCORE_FACTOR if self.rescore else k)
+        candidates = np.sort(np.argpartition(-scores, n_candidates - 1)[:n_candidates])
+        if self.rescore:
+            candidate_scores = self._full_vectors(gen, candidates) @ query
+        else:
+            candidate_scores = scores[candidates]
+
+        results = []
+        for i in np.argsort(-candidate_scores)[:k]:
+            position = candidates[i]
+            doc = Document(page_content=gen.documents[position], metadata=gen.metadatas[position] or {},
+                           id=gen.ids[position])
+            results.append((doc, float(candidate_scores[i])))
+        return results
+
+    def similarity_search_with_score_by_vectors(self, embeddings, k: int = 4) -> list:
+        """Top-k (document, cosine similarity) pairs for each query vector, from one pass over the matrix."""
+        gen = self._current()
+        if not gen.ids:
+            return [[] for _ in embeddings]
+        queries = _normalize(np.asarray(embeddings, dtype=np.float32))
+        scores = self._approximate_scores(gen, queries)
+        return [self._top_k(gen, query, scores[:, j], k) for j, query in enumerate(queries)]
+
+    def similarity_search_by_vectors(self, embeddings, k: int = 4) -> list:
+        return [[doc for doc, _ in pairs] for pairs in self.similarity_search_with_score_by_vectors(embeddings, k)]
+
+    def similarity_search_with_score_by_vector(self, embedding, k: int = 4):
+        """Top-k (document, cosine similarity) pairs."""
+        return self.similarity_search_with_score_by_vectors([embedding], k)[0]
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs):
+        return self.similarity_search_with_score_by_vector(self._embedding_function.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, directory: str = None, **kwargs):
+        store = cls(directory, embedding_function=embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
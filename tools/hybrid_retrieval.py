@@ -0,0 +1,280 @@
+# tools/hybrid_retrieval.py
+import os
+import re
+import json
+import math
+import heapq
+import logging
+import threading
+from collections import Counter
+from langchain_core.documents import Document
+from tools.rerank import drop_near_duplicates, mmr_select
+from tools.ingestion import load_manifest, manifest_path
+
+BM25_INDEX_NAME = "bm25.json"
+RRF_K = int(os.getenv("HYBRID_RRF_K", 60))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how i in is it of on or should that the "
+    "their this to was what when which who with you your".split()
+)
+
+def tokenize(text: str) -> list:
+    """Lowercase word and number tokens; numbers and units like "150" or "mg" are kept."""
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over the chunks of one collection, stored as an inverted index
+    ({term: [[doc position, term frequency], ...]}) next to the collection's manifest.
+    Only chunk ids are kept; texts are read back from Chroma.
+    """
+
+    def __init__(self, ids, doc_lengths, postings, version=0, k1=1.5, b=0.75):
+        self.ids = ids
+        self.doc_lengths = doc_lengths
+        self.postings = postings
+        self.version = version
+        self.k1 = k1
+        self.b = b
+        self.avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+
+    @classmethod
+    def build(cls, ids, texts, version=0):
+        postings, doc_lengths = {}, []
+        for position, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append([position, tf])
+        return cls(list(ids), doc_lengths, postings, version=version)
+
+    @classmethod
+    def load(cls, directory: str):
+        path = os.path.join(directory, BM25_INDEX_NAME)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(data["ids"], data["doc_lengths"], data["postings"], version=data["version"])
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable BM25 index ({path}): {e}")
+            return None
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, BM25_INDEX_NAME)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "ids": self.ids,
+                       "doc_lengths": self.doc_lengths, "postings": self.postings}, f)
+        os.replace(tmp_path, path)
+
+    def search(self, query: str, n: int = 10) -> list:
+        """Top-n (chunk id, score) pairs for a query."""
+        n_docs = len(self.ids)
+        if not n_docs:
+            return []
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[position] / (self.avg_length or 1))
+                scores[position] = scores.get(position, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        best = heapq.nlargest(n, scores.items(), key=lambda item: item[1])
+        return [(self.ids[position], score) for position, score in best]
+
+
+def ensure_bm25_index(vectorstore, directory: str, version: int) -> BM25Index:
+    """
+    Load the collection's BM25 index, rebuilding it from the stored chunks when it
+    is missing or out of date with the collection (version or chunk count differ).
+    """
+    index = BM25Index.load(directory)
+    count = vectorstore._collection.count()
+    if index is not None and index.version == version and len(index.ids) == count:
+        return index
+
+    logging.info(f"Building BM25 index over {count} chunks: {directory}")
+    stored = vectorstore.get(include=["documents"])
+    index = BM25Index.build(stored["ids"], stored["documents"], version=version)
+    index.save(directory)
+    return index
+
+
+def reciprocal_rank_fusion(rankings, k: int = RRF_K) -> list:
+    """Fuse ranked id lists: score(id) = sum over rankings of 1 / (k + rank)."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class HybridSearcher:
+    """
+    Retrieval pipeline for one collection:
+    1. over-fetch candidates by vector similarity and, when a BM25 index is given,
+       fuse them with the BM25 ranking using reciprocal-rank fusion;
+    2. drop near-duplicate chunks (overlapping windows of the same passage);
+    3. pick the final k with maximal marginal relevance against the query vector.
+    The lexical side is local, so if the embedding call fails the BM25 ranking is
+    served on its own instead of failing the retrieval.
+    With `bm25_directory`, the BM25 index is reloaded from there whenever the
+    collection's manifest version moves (another process re-indexed it), so both
+    rankings always come from the same chunk set.
+    """
+
+    def __init__(self, vectorstore, embeddings, bm25: BM25Index = None, k: int = 3, candidates: int = None,
+                 mmr: bool = True, mmr_lambda: float = 0.7, dedup_threshold: float = 0.5,
+                 bm25_directory: str = None):
+        self.vectorstore = vectorstore
+        self.embeddings = embeddings
+        self.bm25 = bm25
+        self.bm25_directory = bm25_directory
+        self._bm25_mtimes = None
+        self._bm25_lock = threading.Lock()
+        self.k = k
+        self.candidates = candidates or max(4 * k, 10)
+        self.mmr = mmr
+        self.mmr_lambda = mmr_lambda
+        self.dedup_threshold = dedup_threshold
+
+    def _current_bm25(self):
+        """
+        The BM25 index for the collection version on disk, re-checked when the manifest
+        or index file changes. None while the index has not been rebuilt for a new
+        version yet, so the vector ranking is served alone instead of mixing corpora.
+        """
+        if self.bm25_directory is None:
+            return self.bm25
+        mtimes = []
+        for path in (manifest_path(self.bm25_directory), os.path.join(self.bm25_directory, BM25_INDEX_NAME)):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        with self._bm25_lock:
+            if mtimes != self._bm25_mtimes:
+                self._bm25_mtimes = mtimes
+                version = load_manifest(self.bm25_directory).get("version", 0)
+                if self.bm25 is None or self.bm25.version != version:
+                    index = BM25Index.load(self.bm25_directory)
+                    self.bm25 = index if index is not None and index.version == version else None
+                    if self.bm25 is None:
+                        logging.warning(f"BM25 index not rebuilt for version {version} yet, "
+                                        f"using vector search only: {self.bm25_directory}")
+                    else:
+                        logging.info(f"Reloaded BM25 index for version {version}: {self.bm25_directory}")
+            return self.bm25
+
+    def _documents(self, ids) -> list:
+        if not ids:
+            return []
+        stored = self.vectorstore.get(ids=list(ids), include=["documents", "metadatas"])
+        by_id = {
+            doc_id: Document(page_content=text, metadata=metadata or {}, id=doc_id)
+            for doc_id, text, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+        }
+        return [by_id[doc_id] for doc_id in ids if doc_id in by_id]
+
+    def _vectors(self, docs) -> list:
+        stored = self.vectorstore._collection.get(ids=[doc.id for doc in docs], include=["embeddings"])
+        by_id = dict(zip(stored["ids"], stored["embeddings"]))
+        return [by_id[doc.id] for doc in docs]
+
+    def _vector_search_batch(self, query_vectors) -> list:
+        """Vector candidates for several query vectors in one backend call."""
+        batch_search = getattr(self.vectorstore, "similarity_search_by_vectors", None)
+        if batch_search is not None:
+            return batch_search(query_vectors, k=self.candidates)
+        results = self.vectorstore._collection.query(
+            query_embeddings=query_vectors, n_results=self.candidates, include=["documents", "metadatas"]
+        )
+        return [
+            [Document(page_content=text, metadata=metadata or {}, id=doc_id)
+             for doc_id, text, metadata in zip(ids, texts, metadatas)]
+            for ids, texts, metadatas in zip(results["ids"], results["documents"], results["metadatas"])
+        ]
+
+    def _candidates(self, query: str, vector_docs, bm25) -> list:
+        if bm25 is not None:
+            lexical_ids = [doc_id for doc_id, _ in bm25.search(query, self.candidates)]
+            known = {doc.id: doc for doc in vector_docs}
+            fused = reciprocal_rank_fusion([[doc.id for doc in vector_docs], lexical_ids])[:self.candidates]
+            known.update({doc.id: doc for doc in self._documents([i for i in fused if i not in known])})
+            candidates = [known[doc_id] for doc_id in fused if doc_id in known]
+        else:
+            candidates = vector_docs
+        return drop_near_duplicates(candidates, self.dedup_threshold)
+
+    def _select_batch(self, queries, query_vectors, bm25) -> list:
+        searchable = [vector for vector in query_vectors if vector is not None]
+        vector_results = iter(self._vector_search_batch(searchable) if searchable else [])
+        per_query = [
+            self._candidates(query, next(vector_results) if vector is not None else [], bm25)
+            for query, vector in zip(queries, query_vectors)
+        ]
+
+        # One vector fetch covers the MMR step of every query in the batch
+        needs_mmr = {
+            i for i, (vector, candidates) in enumerate(zip(query_vectors, per_query))
+            if self.mmr and vector is not None and len(candidates) > self.k
+        }
+        vectors_by_id = {}
+        if needs_mmr:
+            docs = list({doc.id: doc for i in needs_mmr for doc in per_query[i]}.values())
+            vectors_by_id = dict(zip([doc.id for doc in docs], self._vectors(docs)))
+
+        results = []
+        for i, (vector, candidates) in enumerate(zip(query_vectors, per_query)):
+            if i in needs_mmr:
+                doc_vectors = [vectors_by_id[doc.id] for doc in candidates]
+                results.append(mmr_select(vector, candidates, doc_vectors, self.k, self.mmr_lambda))
+            else:
+                results.append(candidates[:self.k])
+        return results
+
+    def search_batch(self, queries) -> list:
+        """
+        Documents for each of several queries: one embedding request for all of them,
+        one batched similarity search and one vector fetch for reranking.
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+        bm25 = self._current_bm25()
+        try:
+            query_vectors = self.embeddings.embed_documents(queries)
+        except Exception as e:
+            if bm25 is None:
+                raise
+            logging.warning(f"Vector search failed, serving BM25 results only: {e}")
+            query_vectors = [None] * len(queries)
+        return self._select_batch(queries, query_vectors, bm25)
+
+    async def asearch_batch(self, queries) -> list:
+        queries = list(queries)
+        if not queries:
+            return []
+        bm25 = self._current_bm25()
+        try:
+            query_vectors = await self.embeddings.aembed_documents(queries)
+        except Exception as e:
+            if bm25 is None:
+                raise
+            logging.warning(f"Vector search failed, serving BM25 results only: {e}")
+            query_vectors = [None] * len(queries)
+        return self._select_batch(queries, query_vectors, bm25)
+
+    def search(self, query: str) -> list:
+        return self.search_batch([query])[0]
+
+    async def asearch(self, query: str) -> list:
+        return (await self.asearch_batch([query]))[0]
@@ -0,0 +1,281 @@
+# tools/ingestion.py
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from embedding_providers import DEFAULT_PROVIDER_ID
+
+MANIFEST_NAME = "manifest.json"
+
+# Embedding pipeline tuning
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 64))
+INGEST_MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", 4))
+INGEST_MAX_RETRIES = int(os.getenv("INGEST_MAX_RETRIES", 3))
+
+# ----------------------------
+# Hashing helpers
+# ----------------------------
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def chunk_hash(source_name: str, text: str) -> str:
+    """Content hash of a chunk; also used as its id in the collection."""
+    return hashlib.sha256(f"{source_name}\0{text}".encode("utf-8")).hexdigest()
+
+def source_basename(path: str) -> str:
+    """File name of a source path, including Windows paths recorded by older builds."""
+    return re.split(r"[\\/]", path)[-1]
+
+def _source_fingerprint(file_hash: str, chunking: dict) -> str:
+    payload = json.dumps([file_hash, chunking], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# ----------------------------
+# Manifest persistence
+# ----------------------------
+def manifest_path(persist_directory: str) -> str:
+    return os.path.join(persist_directory, MANIFEST_NAME)
+
+def load_manifest(persist_directory: str, collection_name: str = None) -> dict:
+    """
+    Manifest layout:
+    {"collection": name, "version": n, "embedding_provider": provider id,
+     "sources": {file name: {"sha256", "fingerprint", "chunking", "chunks": {chunk hash: stored id}}}}
+    A source whose embedding run was interrupted carries "pending": fingerprint and
+    the chunks written so far, so the next run resumes instead of starting over.
+    """
+    path = manifest_path(persist_directory)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"collection": collection_name, "version": 0, "sources": {}}
+
+def save_manifest(persist_directory: str, manifest: dict) -> None:
+    os.makedirs(persist_directory, exist_ok=True)
+    path = manifest_path(persist_directory)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+# ----------------------------
+# Incremental sync
+# ----------------------------
+def _split_unique(source_name: str, documents, text_splitter) -> dict:
+    """Split documents and key the chunks by content hash (exact repeats collapse)."""
+    chunks = {}
+    for doc in text_splitter.split_documents(documents):
+        chunks.setdefault(chunk_hash(source_name, doc.page_content), doc)
+    return chunks
+
+def _adopt_legacy_chunks(vectorstore, source_name: str):
+    """
+    Map the chunks of a collection built before manifests existed, so unchanged
+    text keeps its vector instead of being re-embedded.
+    Returns ({chunk hash: stored id}, [ids of exact duplicates]).
+    """
+    existing = vectorstore.get(include=["documents", "metadatas"])
+    adopted, duplicates = {}, []
+    for stored_id, text, metadata in zip(existing["ids"], existing["documents"], existing["metadatas"]):
+        source = (metadata or {}).get("source")
+        if source and source_basename(source) != source_name:
+            continue
+        h = chunk_hash(source_name, text or "")
+        if h in adopted:
+            duplicates.append(stored_id)
+        else:
+            adopted[h] = stored_id
+    return adopted, duplicates
+
+# ----------------------------
+# Batched, parallel embedding stage
+# ----------------------------
+def _embed_with_retry(embeddings, texts, retries: int):
+    for attempt in range(retries + 1):
+        try:
+            return embeddings.embed_documents(texts)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = 2 ** attempt
+            logging.warning(f"Embedding batch failed ({e}); retry {attempt + 1}/{retries} in {delay}s")
+            time.sleep(delay)
+
+def embed_and_write(vectorstore, chunks: dict, hashes, on_batch_written=None,
+                    batch_size=INGEST_BATCH_SIZE, max_workers=INGEST_MAX_WORKERS,
+                    retries=INGEST_MAX_RETRIES) -> None:
+    """
+    Embed the given chunks in fixed-size batches on a bounded thread pool and upsert
+    each batch into the collection as soon as it is ready. Failed batches are retried
+    with backoff; `on_batch_written(batch_hashes)` is called after every write so the
+    caller can checkpoint. Raises once all other batches have been written if any
+    batch still failed.
+    """
+    batches = [hashes[i:i + batch_size] for i in range(0, len(hashes), batch_size)]
+    if not batches:
+        return
+
+    embeddings = vectorstore.embeddings
+    failures = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_embed_with_retry, embeddings, [chunks[h].page_content for h in batch], retries): batch
+            for batch in batches
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            batch = futures[future]
+            try:
+                vectors = future.result()
+            except Exception as e:
+                failures.append(e)
+                logging.error(f"Embedding batch {done}/{len(batches)} failed for good: {e}")
+                continue
+
+            # Writes stay on this thread; only the embedding calls run in parallel
+            vectorstore._collection.upsert(
+                ids=list(batch),
+                embeddings=vectors,
+                documents=[chunks[h].page_content for h in batch],
+                metadatas=[chunks[h].metadata or {"chunk_hash": h} for h in batch],
+            )
+            if on_batch_written:
+                on_batch_written(batch)
+            logging.info(f"Embedded batch {done}/{len(batches)} ({len(batch)} chunks)")
+
+    if failures:
+        raise RuntimeError(f"{len(failures)} of {len(batches)} embedding batches failed; "
+                           "re-run to resume from the last checkpoint")
+
+def check_embedding_provider(manifest: dict, vectorstore, embedding_provider) -> bool:
+    """
+    Refuse to mix vectors from different embedding providers in one collection.
+    Returns True when the provider was newly recorded in the manifest.
+    """
+    recorded = manifest.get("embedding_provider")
+    if recorded is None and (manifest["sources"] or vectorstore._collection.count()):
+        # Built before providers were recorded, i.e. with Watsonx
+        recorded = DEFAULT_PROVIDER_ID
+    if embedding_provider and recorded and embedding_provider != recorded:
+        raise ValueError(
+            f"Collection {manifest.get('collection')} was embedded with {recorded}, "
+            f"not {embedding_provider}; rebuild it or switch EMBEDDING_PROVIDER back"
+        )
+    provider = embedding_provider or recorded
+    if provider and manifest.get("embedding_provider") != provider:
+        manifest["embedding_provider"] = provider
+        return True
+    return False
+
+def sync_collection(vectorstore, collection_name: str, persist_directory: str,
+                    source_paths, load_documents, text_splitter, embedding_provider=None) -> dict:
+    """
+    Bring a collection in line with its source files, embedding only new or changed
+    chunks and deleting stale ones. Sources whose content and chunking are unchanged
+    are skipped without being parsed. Raises ValueError if the collection was built
+    with a different embedding provider. Returns the updated manifest.
+
+    Stores with a bulk() block (the flat store) get one write per source; their
+    checkpoints are saved only once that write is committed, so the manifest never
+    lists chunks the store does not hold.
+    """
+    manifest = load_manifest(persist_directory, collection_name)
+    provider_recorded = check_embedding_provider(manifest, vectorstore, embedding_provider)
+    chunking = {
+        "splitter": type(text_splitter).__name__,
+        "chunk_size": getattr(text_splitter, "_chunk_size", None),
+        "chunk_overlap": getattr(text_splitter, "_chunk_overlap", None),
+        "separators": getattr(text_splitter, "_separators", None),
+    }
+    changed = False
+    source_names = set()
+    deferred = hasattr(vectorstore, "bulk")
+
+    for source_path in source_paths:
+        source_name = os.path.basename(source_path)
+        source_names.add(source_name)
+        entry = manifest["sources"].get(source_name)
+
+        if not os.path.exists(source_path):
+            # A prebuilt store can be served without its source document
+            if entry or vectorstore._collection.count():
+                logging.warning(f"Source missing, keeping indexed chunks: {source_path}")
+                continue
+            raise FileNotFoundError(f"Source file not found: {source_path}")
+
+        file_hash = file_sha256(source_path)
+        fingerprint = _source_fingerprint(file_hash, chunking)
+        if entry and entry.get("fingerprint") == fingerprint:
+            logging.info(f"Up to date, skipping: {source_name}")
+            continue
+        if entry and entry.get("pending") == fingerprint:
+            logging.info(f"Resuming interrupted indexing of: {source_name}")
+
+        logging.info(f"Indexing changed source: {source_name}")
+        if entry:
+            stored, duplicates = entry["chunks"], []
+        else:
+            stored, duplicates = _adopt_legacy_chunks(vectorstore, source_name)
+        chunks = _split_unique(source_name, load_documents(source_path), text_splitter)
+
+        new_hashes = [h for h in chunks if h not in stored]
+        stale_ids = [stored_id for h, stored_id in stored.items() if h not in chunks] + duplicates
+
+        error = None
+        with vectorstore.bulk() if deferred else nullcontext():
+            if new_hashes:
+                logging.info(f"Embedding {len(new_hashes)} new chunks from {source_name}")
+                # Checkpoint: written chunks are recorded while the source stays marked pending
+                checkpoint = manifest["sources"].setdefault(source_name, {"chunks": dict(stored)})
+                checkpoint["pending"] = fingerprint
+                stored = checkpoint["chunks"]
+
+                def _checkpoint(batch):
+                    stored.update({h: h for h in batch})
+                    if not deferred:
+                        save_manifest(persist_directory, manifest)
+
+                try:
+                    embed_and_write(vectorstore, chunks, new_hashes, on_batch_written=_checkpoint)
+                except Exception as e:
+                    error = e
+            if stale_ids and error is None:
+                logging.info(f"Deleting {len(stale_ids)} stale chunks from {source_name}")
+                vectorstore.delete(ids=stale_ids)
+        if error is not None:
+            # The bulk block has committed the batches written before the failure
+            if deferred:
+                save_manifest(persist_directory, manifest)
+            raise error
+
+        manifest["sources"][source_name] = {
+            "sha256": file_hash,
+            "fingerprint": fingerprint,
+            "chunking": chunking,
+            "chunks": {h: stored.get(h, h) for h in chunks},
+        }
+        changed = True
+
+    # Sources that were dropped from the builder's list
+    with vectorstore.bulk() if deferred else nullcontext():
+        for source_name in list(manifest["sources"]):
+            if source_name not in source_names:
+                stale_ids = list(manifest["sources"][source_name]["chunks"].values())
+                logging.info(f"Removing {len(stale_ids)} chunks of dropped source {source_name}")
+                if stale_ids:
+                    vectorstore.delete(ids=stale_ids)
+                del manifest["sources"][source_name]
+                changed = True
+
+    if changed:
+        manifest["version"] = manifest.get("version", 0) + 1
+    if changed or provider_recorded:
+        save_manifest(persist_directory, manifest)
+    return manifest
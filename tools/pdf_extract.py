@@ -0,0 +1,121 @@
+# tools/pdf_extract.py
+import os
+import json
+import logging
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from langchain_core.documents import Document
+from tools.ingestion import file_sha256
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+
+PAGE_CACHE_DIR = os.getenv("PDF_PAGE_CACHE_DIR", os.path.join(this_dir, "..", "data", "page_cache"))
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", os.cpu_count() or 1))
+PAGES_PER_TASK = 16
+
+# Bump when the extraction itself changes so old page caches are ignored
+EXTRACTOR_VERSION = 2
+
+
+def _extract_page_range(path: str, start: int, end: int):
+    """Worker: text and label of pages [start, end), extracted the same way PyPDFLoader does."""
+    import pypdf
+
+    reader = pypdf.PdfReader(path)
+    labels = reader.page_labels
+    return [
+        (i, labels[i], reader.pages[i].extract_text(extraction_mode="plain").strip())
+        for i in range(start, end)
+    ]
+
+
+def _document_metadata(reader) -> dict:
+    """The PDF's document info, normalized the way PyPDFLoader does (lowercase keys, ISO dates)."""
+    metadata = {}
+    for key, value in {"producer": "PyPDF", "creator": "PyPDF", "creationdate": "", **(reader.metadata or {})}.items():
+        if type(value) not in (str, int):
+            value = str(value)
+        key = key.lstrip("/").lower()
+        if key in ("creationdate", "moddate"):
+            try:
+                value = datetime.strptime(value.replace("'", ""), "D:%Y%m%d%H%M%S%z").isoformat("T")
+            except ValueError:
+                pass
+        elif isinstance(value, str):
+            value = value.strip()
+        metadata[key] = value
+    return metadata
+
+
+def _worker_context():
+    # Never fork: parsing runs from the warm-up thread of a multi-threaded Streamlit
+    # process, and forking one that holds Chroma/httpx thread locks can deadlock
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _extract_pages(path: str, max_workers: int):
+    import pypdf
+
+    reader = pypdf.PdfReader(path)
+    total_pages = len(reader.pages)
+    document_metadata = _document_metadata(reader)
+    ranges = [(start, min(start + PAGES_PER_TASK, total_pages))
+              for start in range(0, total_pages, PAGES_PER_TASK)]
+
+    pages = []
+    if max_workers > 1 and len(ranges) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(ranges)), mp_context=_worker_context()) as pool:
+                for part in pool.map(_extract_page_range, [path] * len(ranges),
+                                     [start for start, _ in ranges], [end for _, end in ranges]):
+                    pages.extend(part)
+            return pages, total_pages, document_metadata
+        except Exception as e:
+            logging.warning(f"Parallel PDF parsing failed, parsing serially: {e}")
+            pages = []
+
+    for start, end in ranges:
+        pages.extend(_extract_page_range(path, start, end))
+    return pages, total_pages, document_metadata
+
+
+def _cache_path(file_hash: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, f"{file_hash}.v{EXTRACTOR_VERSION}.jsonl")
+
+
+def load_pdf_pages(path: str, cache_dir=PAGE_CACHE_DIR, max_workers=PDF_PARSE_WORKERS):
+    """
+    Drop-in replacement for PyPDFLoader(path).load(): one Document per page, with
+    the same text and metadata (document info, source, total_pages, page, page_label).
+    Extracted pages are stored as JSONL keyed by the file's SHA-256, so re-chunking
+    or rebuilding a store never parses the same PDF twice. A cold parse is spread
+    over a process pool in page ranges.
+    """
+    file_hash = file_sha256(path)
+    cache_file = _cache_path(file_hash, cache_dir)
+
+    if os.path.exists(cache_file):
+        logging.info(f"Loading extracted pages from cache: {cache_file}")
+        with open(cache_file, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    else:
+        logging.info(f"Parsing PDF with {max_workers} worker(s): {path}")
+        pages, total_pages, document_metadata = _extract_pages(path, max_workers)
+        records = [
+            {"text": text, "metadata": {**document_metadata, "total_pages": total_pages,
+                                        "page": page, "page_label": label}}
+            for page, label, text in pages
+        ]
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_file = f"{cache_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_file, cache_file)
+
+    return [
+        Document(page_content=record["text"], metadata={**record["metadata"], "source": path})
+        for record in records
+    ]
@@ -1,50 +1,540 @@
 # tools.py
+import os
+import re
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+import weakref
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree.ElementTree import XMLPullParser
 from langchain.tools import BaseTool
+import httpx
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def retrieve_pubmed_abstracts(query: str, max_results: int = 3) -> str:
+ESEARCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
+EFETCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
+
+# ----------------------------
+# Configuration
+# ----------------------------
+this_dir = os.path.dirname(os.path.abspath(__file__))
+
+PUBMED_CACHE_PATH = os.getenv(
+    "PUBMED_CACHE_PATH",
+    os.path.join(this_dir, "..", "data", "pubmed_cache.sqlite3")
+)
+PUBMED_CONNECT_TIMEOUT = float(os.getenv("PUBMED_CONNECT_TIMEOUT", 3.05))
+PUBMED_READ_TIMEOUT = float(os.getenv("PUBMED_READ_TIMEOUT", 10))
+PUBMED_POOL_SIZE = int(os.getenv("PUBMED_POOL_SIZE", 10))
+PUBMED_SEARCH_TTL = int(os.getenv("PUBMED_SEARCH_TTL", 6 * 60 * 60))
+EFETCH_CHUNK_SIZE = 16 * 1024
+EFETCH_BATCH_SIZE = 200  # NCBI recommends at most 200 UIDs per GET
+PUBMED_MAX_RETRIES = int(os.getenv("PUBMED_MAX_RETRIES", 2))
+PUBMED_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+PUBMED_RETRY_BACKOFF = 0.5
+
+# NCBI allows 3 requests/second without an API key and 10 with one
+NCBI_API_KEY = os.getenv("NCBI_API_KEY")
+NCBI_EMAIL = os.getenv("NCBI_EMAIL")
+NCBI_RATE_LIMIT = float(os.getenv("NCBI_RATE_LIMIT", 10 if NCBI_API_KEY else 3))
+
+
+def _normalize_term(query: str) -> str:
+    return re.sub(r"\s+", " ", (query or "").strip().lower())
+
+def _with_credentials(params: dict) -> dict:
+    params["tool"] = "fastagent"
+    if NCBI_API_KEY:
+        params["api_key"] = NCBI_API_KEY
+    if NCBI_EMAIL:
+        params["email"] = NCBI_EMAIL
+    return params
+
+def _search_params(query: str, max_results: int) -> dict:
+    return _with_credentials({
+        "db": "pubmed",
+        "term": query,
+        "retmax": max_results,
+        "retmode": "json"
+    })
+
+def _fetch_params(ids) -> dict:
+    return _with_credentials({
+        "db": "pubmed",
+        "id": ",".join(ids),
+        "retmode": "xml"
+    })
+
+# ----------------------------
+# Shared rate limiter
+# ----------------------------
+class TokenBucket:
     """
-    Fetches up to `max_results` PubMed abstracts for a given query.
+    Thread- and asyncio-safe token bucket. Callers reserve a token under the lock
+    and then sleep (or await) outside it until their slot comes up, so every
+    request from this process shares one NCBI budget.
     """
-    try:
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self) -> None:
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def aacquire(self) -> None:
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+def _retry_delay(response, attempt: int) -> float:
+    """Seconds before retrying a throttled or failed request: Retry-After if sent, else exponential backoff."""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return PUBMED_RETRY_BACKOFF * 2 ** attempt
+
+# ----------------------------
+# Streaming efetch parser
+# ----------------------------
+def _text(element) -> str:
+    return "".join(element.itertext()).strip() if element is not None else ""
+
+def _article_year(article) -> str:
+    year = article.find("MedlineCitation/Article/Journal/JournalIssue/PubDate/Year")
+    if year is not None:
+        return _text(year)
+    medline_date = _text(article.find("MedlineCitation/Article/Journal/JournalIssue/PubDate/MedlineDate"))
+    match = re.search(r"\d{4}", medline_date)
+    if match:
+        return match.group(0)
+    return _text(article.find("MedlineCitation/Article/ArticleDate/Year"))
+
+class EfetchStreamParser:
+    """
+    Incremental parser for efetch XML. Bytes are fed as they arrive and each
+    <PubmedArticle> is turned into a record (PMID, title, year, abstract) and
+    discarded as soon as its end tag is seen, so memory stays flat.
+    """
+
+    def __init__(self):
+        self._parser = XMLPullParser(events=("start", "end"))
+        self._root = None
+
+    def feed(self, data: bytes) -> list:
+        self._parser.feed(data)
+        records = []
+        for event, element in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = element
+                continue
+            if element.tag != "PubmedArticle":
+                continue
+
+            pmid = _text(element.find("MedlineCitation/PMID"))
+            if pmid:
+                records.append({
+                    "pmid": pmid,
+                    "title": _text(element.find("MedlineCitation/Article/ArticleTitle")),
+                    "year": _article_year(element),
+                    "abstract": " ".join(
+                        _text(ab) for ab in element.iterfind("MedlineCitation/Article/Abstract/AbstractText")
+                    ),
+                })
+            # Detach finished articles so the tree never grows
+            element.clear()
+            if self._root is not None:
+                self._root.clear()
+        return records
+
+def _enough(ids, records: dict, needed) -> bool:
+    """
+    True once the leading run of resolved PMIDs (in search-rank order)
+    already holds `needed` abstracts, so the rest of the stream can be skipped.
+    """
+    if needed is None:
+        return False
+    found = 0
+    for i in ids:
+        if i not in records:
+            return False
+        if records[i].get("abstract"):
+            found += 1
+            if found >= needed:
+                return True
+    return False
+
+def _format_abstracts(ids, records: dict, max_results: int) -> str:
+    selected = [records[i] for i in ids if records.get(i, {}).get("abstract")][:max_results]
+
+    if not selected:
+        return "No abstracts found in the retrieved articles."
+
+    formatted = []
+    for i, record in enumerate(selected):
+        title = record.get("title", "")
+        year = f" ({record['year']})" if record.get("year") else ""
+        header = f"{title}{year} [PMID: {record['pmid']}]".strip()
+        formatted.append(f"{i+1}. {header}\n{record['abstract']}")
+    return "\n\n".join(formatted)
+
+
+# ----------------------------
+# Two-level cache: query -> PMIDs (TTL) and PMID -> record (immutable)
+# ----------------------------
+class PubMedCache:
+    def __init__(self, path=PUBMED_CACHE_PATH, search_ttl=PUBMED_SEARCH_TTL):
+        self.search_ttl = search_ttl
+        self._lock = threading.Lock()
+        self._conn = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS esearch (
+                    term TEXT,
+                    retmax INTEGER,
+                    pmids TEXT,
+                    fetched_at REAL,
+                    PRIMARY KEY (term, retmax)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    pmid TEXT PRIMARY KEY,
+                    record TEXT
+                )
+            """)
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"PubMed cache disabled ({path}): {e}")
+            self._conn = None
+
+    def get_search(self, query: str, retmax: int):
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pmids, fetched_at FROM esearch WHERE term = ? AND retmax = ?",
+                (_normalize_term(query), retmax)
+            ).fetchone()
+        if row and time.time() - row[1] <= self.search_ttl:
+            return json.loads(row[0])
+        return None
+
+    def set_search(self, query: str, retmax: int, pmids) -> None:
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO esearch (term, retmax, pmids, fetched_at) VALUES (?, ?, ?, ?)",
+                (_normalize_term(query), retmax, json.dumps(list(pmids)), time.time())
+            )
+            self._conn.commit()
+
+    def get_records(self, pmids) -> dict:
+        if self._conn is None or not pmids:
+            return {}
+        placeholders = ",".join("?" * len(pmids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT pmid, record FROM articles WHERE pmid IN ({placeholders})", list(pmids)
+            ).fetchall()
+        return {pmid: json.loads(record) for pmid, record in rows}
+
+    def set_records(self, records: dict) -> None:
+        if self._conn is None or not records:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO articles (pmid, record) VALUES (?, ?)",
+                [(pmid, json.dumps(record)) for pmid, record in records.items()]
+            )
+            self._conn.commit()
+
+
+# ----------------------------
+# Pooled E-utilities client
+# ----------------------------
+class PubMedClient:
+    """
+    Keep-alive HTTP client for the NCBI E-utilities with timeouts and a
+    two-level cache, so repeat topics never touch the network.
+    """
+
+    def __init__(self, cache=None, connect_timeout=PUBMED_CONNECT_TIMEOUT,
+                 read_timeout=PUBMED_READ_TIMEOUT, pool_size=PUBMED_POOL_SIZE,
+                 rate_limit=NCBI_RATE_LIMIT):
+        self.cache = cache if cache is not None else PubMedCache()
+        self.limiter = TokenBucket(rate_limit)
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+
+        self.session = requests.Session()
+        # The adapter only retries failed connections; 429/5xx retries go through
+        # _get()/_asend() so every attempt takes a token from the rate limiter
+        adapter = HTTPAdapter(
+            pool_connections=2,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.5,
+                              allowed_methods=["GET"])
+        )
+        self.session.mount("https://", adapter)
+
+        # httpx clients are bound to the event loop that created them
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    # ----------------------------
+    # Sync path
+    # ----------------------------
+    def _get(self, url: str, params: dict, stream: bool = False):
+        """GET under the rate limiter, retrying 429/5xx responses with a fresh token per attempt."""
+        for attempt in range(PUBMED_MAX_RETRIES + 1):
+            self.limiter.acquire()
+            response = self.session.get(url, params=params, timeout=self.timeout, stream=stream)
+            if response.status_code not in PUBMED_RETRY_STATUSES or attempt == PUBMED_MAX_RETRIES:
+                return response
+            delay = _retry_delay(response, attempt)
+            response.close()
+            logging.warning(f"PubMed returned {response.status_code}; retry {attempt + 1}/{PUBMED_MAX_RETRIES} in {delay:.1f}s")
+            time.sleep(delay)
+
+    def search(self, query: str, max_results: int = 3):
+        ids = self.cache.get_search(query, max_results)
+        if ids is not None:
+            return ids
+
+        response = self._get(ESEARCH_URL, _search_params(query, max_results))
+        response.raise_for_status()
+        ids = response.json().get("esearchresult", {}).get("idlist", [])
+        self.cache.set_search(query, max_results, ids)
+        return ids
+
+    def fetch(self, ids, needed=None) -> dict:
+        """
+        Records for `ids`, from the cache first. Missing articles are parsed off the
+        efetch stream, which is closed early once `needed` abstracts are in hand.
+        """
+        records = self.cache.get_records(ids)
+        missing = [i for i in ids if i not in records]
+        if missing and not _enough(ids, records, needed):
+            fetched = {}
+            parser = EfetchStreamParser()
+            with self._get(EFETCH_URL, _fetch_params(missing), stream=True) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=EFETCH_CHUNK_SIZE):
+                    for record in parser.feed(chunk):
+                        fetched[record["pmid"]] = record
+                        records[record["pmid"]] = record
+                    if _enough(ids, records, needed):
+                        break
+            self.cache.set_records(fetched)
+        return records
+
+    def retrieve(self, query: str, max_results: int = 3) -> str:
         # Step 1: Search for PubMed IDs
-        search_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
-        search_params = {
-            "db": "pubmed",
-            "term": query,
-            "retmax": max_results,
-            "retmode": "json"
-        }
-        search_response = requests.get(search_url, params=search_params)
-        search_response.raise_for_status()
-        ids = search_response.json().get("esearchresult", {}).get("idlist", [])
+        ids = self.search(query, max_results)
+        if not ids:
+            return "No relevant PubMed articles found."
+
+        # Step 2: Fetch abstracts, stopping once max_results are collected
+        return _format_abstracts(ids, self.fetch(ids, needed=max_results), max_results)
+
+    # ----------------------------
+    # Async path
+    # ----------------------------
+    def _async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                transport=httpx.AsyncHTTPTransport(retries=2),
+            )
+            self._async_clients[loop] = client
+        return client
+
+    async def _asend(self, url: str, params: dict, stream: bool = False) -> httpx.Response:
+        """Async _get(); a streamed response must be closed by the caller."""
+        client = self._async_client()
+        for attempt in range(PUBMED_MAX_RETRIES + 1):
+            await self.limiter.aacquire()
+            response = await client.send(client.build_request("GET", url, params=params), stream=stream)
+            if response.status_code not in PUBMED_RETRY_STATUSES or attempt == PUBMED_MAX_RETRIES:
+                return response
+            delay = _retry_delay(response, attempt)
+            await response.aclose()
+            logging.warning(f"PubMed returned {response.status_code}; retry {attempt + 1}/{PUBMED_MAX_RETRIES} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def asearch(self, query: str, max_results: int = 3):
+        ids = self.cache.get_search(query, max_results)
+        if ids is not None:
+            return ids
+
+        response = await self._asend(ESEARCH_URL, _search_params(query, max_results))
+        response.raise_for_status()
+        ids = response.json().get("esearchresult", {}).get("idlist", [])
+        self.cache.set_search(query, max_results, ids)
+        return ids
+
+    async def afetch(self, ids, needed=None) -> dict:
+        records = self.cache.get_records(ids)
+        missing = [i for i in ids if i not in records]
+        if missing and not _enough(ids, records, needed):
+            fetched = {}
+            parser = EfetchStreamParser()
+            response = await self._asend(EFETCH_URL, _fetch_params(missing), stream=True)
+            try:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes(EFETCH_CHUNK_SIZE):
+                    for record in parser.feed(chunk):
+                        fetched[record["pmid"]] = record
+                        records[record["pmid"]] = record
+                    if _enough(ids, records, needed):
+                        break
+            finally:
+                await response.aclose()
+            self.cache.set_records(fetched)
+        return records
+
+    async def aretrieve(self, query: str, max_results: int = 3) -> str:
+        ids = await self.asearch(query, max_results)
+        if not ids:
+            return "No relevant PubMed articles found."
+        return _format_abstracts(ids, await self.afetch(ids, needed=max_results), max_results)
+
+    # ----------------------------
+    # Batch path
+    # ----------------------------
+    def retrieve_batch(self, queries, max_results: int = 3, max_workers: int = 4) -> dict:
+        """
+        Answer many queries at once: esearch calls run concurrently under the shared
+        rate limit, then the PMIDs of every query are merged into as few efetch
+        calls as possible. Returns {query: formatted abstracts}.
+        """
+        queries = list(dict.fromkeys(queries))
+        search_results = {}
+
+        def _search(query):
+            try:
+                return query, self.search(query, max_results)
+            except Exception as e:
+                return query, e
 
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for query, ids in executor.map(_search, queries):
+                search_results[query] = ids
+
+        all_ids = list(dict.fromkeys(
+            i for ids in search_results.values() if not isinstance(ids, Exception) for i in ids
+        ))
+        records, fetch_error = {}, None
+        for start in range(0, len(all_ids), EFETCH_BATCH_SIZE):
+            try:
+                records.update(self.fetch(all_ids[start:start + EFETCH_BATCH_SIZE]))
+            except Exception as e:
+                fetch_error = e
+
+        return {query: self._format_batch_result(ids, records, max_results, fetch_error)
+                for query, ids in search_results.items()}
+
+    async def aretrieve_batch(self, queries, max_results: int = 3) -> dict:
+        queries = list(dict.fromkeys(queries))
+        searched = await asyncio.gather(*(self.asearch(q, max_results) for q in queries), return_exceptions=True)
+        search_results = dict(zip(queries, searched))
+
+        all_ids = list(dict.fromkeys(
+            i for ids in search_results.values() if not isinstance(ids, Exception) for i in ids
+        ))
+        records, fetch_error = {}, None
+        for start in range(0, len(all_ids), EFETCH_BATCH_SIZE):
+            try:
+                records.update(await self.afetch(all_ids[start:start + EFETCH_BATCH_SIZE]))
+            except Exception as e:
+                fetch_error = e
+
+        return {query: self._format_batch_result(ids, records, max_results, fetch_error)
+                for query, ids in search_results.items()}
+
+    @staticmethod
+    def _format_batch_result(ids, records: dict, max_results: int, fetch_error=None) -> str:
+        if isinstance(ids, Exception):
+            return f"Error retrieving data from PubMed: {ids}"
         if not ids:
             return "No relevant PubMed articles found."
+        if fetch_error is not None and not any(i in records for i in ids):
+            return f"Error retrieving data from PubMed: {fetch_error}"
+        return _format_abstracts(ids, records, max_results)
 
-        # Step 2: Fetch abstracts
-        fetch_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
-        fetch_params = {
-            "db": "pubmed",
-            "id": ",".join(ids),
-            "retmode": "xml"
-        }
-        fetch_response = requests.get(fetch_url, params=fetch_params)
-        fetch_response.raise_for_status()
 
-        soup = BeautifulSoup(fetch_response.text, "lxml-xml")
-        abstracts = [ab.text.strip() for ab in soup.find_all("AbstractText")][:max_results]
+# Shared client for the whole process
+pubmed_client = PubMedClient()
 
-        if not abstracts:
-            return "No abstracts found in the retrieved articles."
+def retrieve_pubmed_abstracts(query: str, max_results: int = 3) -> str:
+    """
+    Fetches up to `max_results` PubMed abstracts for a given query.
+    """
+    try:
+        return pubmed_client.retrieve(query, max_results)
+    except Exception as e:
+        return f"Error retrieving data from PubMed: {e}"
 
-        return "\n\n".join([f"{i+1}. {a}" for i, a in enumerate(abstracts)])
+def retrieve_pubmed_abstracts_batch(queries, max_results: int = 3) -> dict:
+    """
+    Fetches up to `max_results` PubMed abstracts for each of many queries,
+    sharing one NCBI rate limit and merging all PMIDs into batched efetch calls.
+    """
+    try:
+        return pubmed_client.retrieve_batch(queries, max_results)
+    except Exception as e:
+        return {query: f"Error retrieving data from PubMed: {e}" for query in queries}
 
+async def aretrieve_pubmed_abstracts(query: str, max_results: int = 3) -> str:
+    """
+    Async variant of retrieve_pubmed_abstracts built on httpx, so the event loop
+    is never blocked on the E-utilities round-trips.
+    """
+    try:
+        return await pubmed_client.aretrieve(query, max_results)
     except Exception as e:
         return f"Error retrieving data from PubMed: {e}"
 
 
+async def aretrieve_pubmed_abstracts_batch(queries, max_results: int = 3) -> dict:
+    try:
+        return await pubmed_client.aretrieve_batch(queries, max_results)
+    except Exception as e:
+        return {query: f"Error retrieving data from PubMed: {e}" for query in queries}
+
+
 # ----------------------------
 # Define a LangChain Tool
 # ----------------------------
@@ -57,8 +547,8 @@ class MedicalInfoTool(BaseTool):
         return retrieve_pubmed_abstracts(query)
 
     async def _arun(self, query: str) -> str:
-        """Async run (not implemented)"""
-        raise NotImplementedError("Async not implemented.")
+        """Async run"""
+        return await aretrieve_pubmed_abstracts(query)
 
 
 # Instantiate the tool for use in agents
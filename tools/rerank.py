@@ -0,0 +1,47 @@
+# tools/rerank.py
+import re
+import zlib
+import numpy as np
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+
+SHINGLE_SIZE = 5
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """Hashed word n-grams of a text (the whole text if it is shorter than one shingle)."""
+    words = re.findall(r"\w+", (text or "").lower())
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))} if words else set()
+    return {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)}
+
+
+def drop_near_duplicates(docs, threshold: float = 0.5) -> list:
+    """
+    Keep documents in rank order, dropping any whose shingles are mostly contained
+    in an already kept document (or contain most of one). Containment rather than
+    Jaccard catches a short chunk that sits inside a longer overlapping one.
+    """
+    kept, kept_shingles = [], []
+    for doc in docs:
+        current = shingles(doc.page_content)
+        duplicate = False
+        for other in kept_shingles:
+            smaller = min(len(current), len(other))
+            if smaller and len(current & other) / smaller >= threshold:
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append(doc)
+            kept_shingles.append(current)
+    return kept
+
+
+def mmr_select(query_vector, docs, doc_vectors, k: int, lambda_mult: float = 0.7) -> list:
+    """Maximal-marginal-relevance pick of k documents, trading relevance for diversity."""
+    if len(docs) <= k:
+        return list(docs)
+    indices = maximal_marginal_relevance(
+        np.asarray(query_vector, dtype=np.float32), np.asarray(doc_vectors, dtype=np.float32),
+        lambda_mult=lambda_mult, k=k
+    )
+    return [docs[i] for i in indices]
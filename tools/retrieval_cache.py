@@ -0,0 +1,75 @@
+# tools/retrieval_cache.py
+import os
+import logging
+import threading
+from collections import OrderedDict
+from tools.ingestion import load_manifest, manifest_path
+
+RETRIEVAL_CACHE_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_ENTRIES", 512))
+
+
+def normalize_retrieval_query(query: str) -> str:
+    return " ".join((query or "").lower().split())
+
+
+class RetrievalCache:
+    """
+    LRU of retrieved documents for one collection, keyed on (normalized query,
+    collection version). The version comes from the collection's ingestion
+    manifest and is re-read whenever the manifest file changes on disk, so a
+    re-index invalidates every cached result.
+    """
+
+    def __init__(self, persist_directory: str, max_entries=RETRIEVAL_CACHE_ENTRIES):
+        self.persist_directory = persist_directory
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._manifest_mtime = None
+        self._version = None
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _current_version(self):
+        """Collection version, refreshed when the manifest's mtime moves (caller holds the lock)."""
+        try:
+            mtime = os.stat(manifest_path(self.persist_directory)).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != self._manifest_mtime:
+            self._manifest_mtime = mtime
+            version = load_manifest(self.persist_directory).get("version", 0) if mtime else 0
+            if version != self._version:
+                if self._entries:
+                    logging.info(f"Collection re-indexed (version {version}), clearing retrieval cache")
+                    self._stats["invalidations"] += 1
+                self._entries.clear()
+                self._version = version
+        return self._version
+
+    def get(self, query: str):
+        """Cached documents for a query, or None."""
+        with self._lock:
+            key = (normalize_retrieval_query(query), self._current_version())
+            docs = self._entries.get(key)
+            if docs is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return docs
+
+    def set(self, query: str, docs) -> None:
+        with self._lock:
+            key = (normalize_retrieval_query(query), self._current_version())
+            self._entries[key] = list(docs)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,303 @@
+# tools/snapshot.py
+"""
+Prebuilt vector-store snapshots.
+
+    python -m tools.snapshot export [--output data/snapshots/corpora.tar.gz]
+    python -m tools.snapshot import [data/snapshots/corpora.tar.gz]
+
+export syncs every enabled corpus (embedding only what changed) and packs each
+collection's chunks, vectors, ingestion manifest and BM25 index into one tar.gz,
+with a snapshot.json listing a sha256 for every file. import verifies the
+checksums, rebuilds the collections under data/stores/<snapshot id>/ in each
+corpus's backend and swaps the data/stores/current link to it in one rename.
+A process that imports its snapshot before opening any store starts with hot
+indexes: the manifests match the bundled sources, so nothing is embedded.
+"""
+import os
+import sys
+import json
+import fcntl
+import shutil
+import tarfile
+import hashlib
+import logging
+import argparse
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import numpy as np
+import chromadb
+from embedding_providers import create_embeddings, embedding_provider_id
+from router import CENTROIDS_PATH
+from tools.ingestion import save_manifest, manifest_path
+from tools.hybrid_retrieval import BM25_INDEX_NAME
+from tools.flat_store import FlatVectorStore
+from tools.corpus_registry import (
+    DATA_DIR, SNAPSHOT_STORES_DIR, CURRENT_STORE_LINK, VECTOR_BACKEND,
+    enabled_corpora, collection_for, manifest_directory, flat_directory, chroma_directory, _open_corpus,
+)
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", os.path.join(DATA_DIR, "snapshots", "corpora.tar.gz"))
+SNAPSHOT_INFO_NAME = "snapshot.json"
+ROUTER_CENTROIDS_NAME = "router_centroids.npz"
+IMPORT_LOCK_NAME = ".import.lock"
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ----------------------------
+# Export
+# ----------------------------
+def export_snapshot(output_path: str = SNAPSHOT_PATH, embeddings=None) -> dict:
+    """
+    Sync every enabled corpus and write its collection to a snapshot archive.
+    Returns the snapshot info (also stored in the archive as snapshot.json).
+    """
+    if embeddings is None:
+        embeddings = create_embeddings()
+    provider = embedding_provider_id(embeddings)
+
+    with tempfile.TemporaryDirectory() as staging:
+        collections = {}
+        for corpus in enabled_corpora():
+            vectorstore, _, manifest_dir = _open_corpus(corpus, embeddings)
+            name = collection_for(corpus, provider)
+            stored = vectorstore._collection.get(include=["embeddings", "documents", "metadatas"])
+            vectors = np.asarray(stored["embeddings"], dtype=np.float32)
+
+            directory = os.path.join(staging, "collections", name)
+            os.makedirs(directory)
+            with open(os.path.join(directory, "records.json"), "w", encoding="utf-8") as f:
+                json.dump({"ids": list(stored["ids"]), "documents": list(stored["documents"]),
+                           "metadatas": list(stored["metadatas"])}, f)
+            np.save(os.path.join(directory, "embeddings.npy"), vectors)
+            shutil.copy2(manifest_path(manifest_dir), os.path.join(directory, "manifest.json"))
+            if os.path.exists(os.path.join(manifest_dir, BM25_INDEX_NAME)):
+                shutil.copy2(os.path.join(manifest_dir, BM25_INDEX_NAME), os.path.join(directory, BM25_INDEX_NAME))
+
+            with open(os.path.join(directory, "manifest.json"), "r", encoding="utf-8") as f:
+                manifest_version = json.load(f).get("version", 0)
+            collections[name] = {
+                "corpus": corpus["name"],
+                "count": len(stored["ids"]),
+                "dim": int(vectors.shape[1]) if len(vectors) else 0,
+                "manifest_version": manifest_version,
+            }
+            logging.info(f"Exported {len(stored['ids'])} chunks of {name}")
+
+        # Semantic router centroids are embedded once per provider too
+        if os.path.exists(CENTROIDS_PATH):
+            shutil.copy2(CENTROIDS_PATH, os.path.join(staging, ROUTER_CENTROIDS_NAME))
+
+        files = {}
+        for dir_path, _, file_names in os.walk(staging):
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                files[os.path.relpath(path, staging).replace(os.sep, "/")] = _file_sha256(path)
+        # The id depends only on the contents, so re-exporting unchanged corpora is a no-op on import
+        content = json.dumps({"embedding_provider": provider, "files": files}, sort_keys=True)
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+        info = {
+            "format": SNAPSHOT_FORMAT,
+            "snapshot_id": content_hash[:16],
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "embedding_provider": provider,
+            "collections": collections,
+            "files": files,
+        }
+        with open(os.path.join(staging, SNAPSHOT_INFO_NAME), "w", encoding="utf-8") as f:
+            json.dump(info, f, indent=2)
+
+        # snapshot.json goes first so import can read the id without unpacking the rest
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        tmp_path = f"{output_path}.tmp"
+        with tarfile.open(tmp_path, "w:gz") as tar:
+            tar.add(os.path.join(staging, SNAPSHOT_INFO_NAME), arcname=SNAPSHOT_INFO_NAME)
+            for name in sorted(files):
+                tar.add(os.path.join(staging, name), arcname=name)
+        os.replace(tmp_path, output_path)
+
+    logging.info(f"Wrote snapshot {info['snapshot_id']} ({len(collections)} collections): {output_path}")
+    return info
+
+
+# ----------------------------
+# Import
+# ----------------------------
+def read_snapshot_info(archive_path: str) -> dict:
+    with tarfile.open(archive_path, "r:gz") as tar:
+        member = tar.next()
+        if member is None or member.name != SNAPSHOT_INFO_NAME:
+            raise ValueError(f"Not a corpus snapshot (no leading {SNAPSHOT_INFO_NAME}): {archive_path}")
+        return json.load(tar.extractfile(member))
+
+def _complete_snapshot_id(directory: str):
+    """Snapshot id of a finished store directory (one whose snapshot.json was written), or None."""
+    try:
+        with open(os.path.join(directory, SNAPSHOT_INFO_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)["snapshot_id"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def current_snapshot_id():
+    """Id of the snapshot data/stores/current points to, or None."""
+    return _complete_snapshot_id(CURRENT_STORE_LINK)
+
+@contextmanager
+def _import_lock():
+    """Serialize imports across processes for the whole restore, swap and cleanup."""
+    os.makedirs(SNAPSHOT_STORES_DIR, exist_ok=True)
+    with open(os.path.join(SNAPSHOT_STORES_DIR, IMPORT_LOCK_NAME), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _verify(extracted: str, info: dict) -> None:
+    if info.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format: {info.get('format')}")
+    for name, expected in info["files"].items():
+        path = os.path.join(extracted, *name.split("/"))
+        if not os.path.exists(path) or _file_sha256(path) != expected:
+            raise ValueError(f"Snapshot checksum mismatch: {name}")
+
+def _restore_collection(source: str, root: str, name: str, backend: str) -> None:
+    with open(os.path.join(source, "records.json"), "r", encoding="utf-8") as f:
+        records = json.load(f)
+    vectors = np.load(os.path.join(source, "embeddings.npy"))
+    ids, documents, metadatas = records["ids"], records["documents"], records["metadatas"]
+
+    if backend == "flat":
+        FlatVectorStore(flat_directory(name, root)).upsert(ids, vectors, documents, metadatas)
+    elif backend == "chroma":
+        collection = chromadb.PersistentClient(path=chroma_directory(root)).get_or_create_collection(
+            name, embedding_function=None
+        )
+        for start in range(0, len(ids), 500):
+            end = start + 500
+            collection.add(ids=ids[start:end], embeddings=vectors[start:end],
+                           documents=documents[start:end], metadatas=metadatas[start:end])
+    else:
+        raise ValueError(f"Unknown vector backend: {backend}")
+
+    manifest_dir = manifest_directory(name, backend, root)
+    with open(os.path.join(source, "manifest.json"), "r", encoding="utf-8") as f:
+        save_manifest(manifest_dir, json.load(f))
+    if os.path.exists(os.path.join(source, BM25_INDEX_NAME)):
+        shutil.copy2(os.path.join(source, BM25_INDEX_NAME), os.path.join(manifest_dir, BM25_INDEX_NAME))
+
+def import_snapshot(archive_path: str = SNAPSHOT_PATH) -> str:
+    """
+    Restore a snapshot under data/stores/ and make it current. Already-current
+    snapshots are skipped. Returns the snapshot id.
+    """
+    info = read_snapshot_info(archive_path)
+    snapshot_id = info["snapshot_id"]
+    if current_snapshot_id() == snapshot_id:
+        logging.info(f"Snapshot {snapshot_id} is already current")
+        return snapshot_id
+
+    with _import_lock():
+        # Another process may have imported it while this one waited for the lock
+        if current_snapshot_id() == snapshot_id:
+            logging.info(f"Snapshot {snapshot_id} is already current")
+            return snapshot_id
+        _import_locked(archive_path, info)
+    return snapshot_id
+
+def _import_locked(archive_path: str, info: dict) -> None:
+    snapshot_id = info["snapshot_id"]
+    backends = {collection_for(corpus, info["embedding_provider"]): corpus.get("backend", VECTOR_BACKEND)
+                for corpus in enabled_corpora()}
+    # Named per process so a store left behind by an interrupted import is never reused
+    target_name = f"{snapshot_id}.{os.getpid()}"
+    target = os.path.join(SNAPSHOT_STORES_DIR, target_name)
+    shutil.rmtree(target, ignore_errors=True)
+
+    with tempfile.TemporaryDirectory(dir=SNAPSHOT_STORES_DIR, prefix=".incoming-") as extracted:
+        with tarfile.open(archive_path, "r:gz") as tar:
+            tar.extractall(extracted, filter="data")
+        _verify(extracted, info)
+
+        for name in info["collections"]:
+            backend = backends.get(name, VECTOR_BACKEND)
+            logging.info(f"Restoring {info['collections'][name]['count']} chunks of {name} ({backend})")
+            _restore_collection(os.path.join(extracted, "collections", name), target, name, backend)
+
+        centroids = os.path.join(extracted, ROUTER_CENTROIDS_NAME)
+        if os.path.exists(centroids) and not os.path.exists(CENTROIDS_PATH):
+            shutil.copy2(centroids, CENTROIDS_PATH)
+        # Written last: only a complete store carries snapshot.json
+        shutil.copy2(os.path.join(extracted, SNAPSHOT_INFO_NAME), os.path.join(target, SNAPSHOT_INFO_NAME))
+
+    # Relative link, swapped with a rename so readers see the old store or the new one
+    previous = os.path.basename(os.path.realpath(CURRENT_STORE_LINK)) if os.path.islink(CURRENT_STORE_LINK) else None
+    tmp_link = f"{CURRENT_STORE_LINK}.{os.getpid()}.tmp"
+    os.symlink(target_name, tmp_link)
+    os.replace(tmp_link, CURRENT_STORE_LINK)
+
+    # The replaced store stays for processes that still have it open; only complete
+    # stores older than that are removed, never one another import is still writing
+    for name in os.listdir(SNAPSHOT_STORES_DIR):
+        path = os.path.join(SNAPSHOT_STORES_DIR, name)
+        if name in (target_name, previous) or name.startswith((".", "current")) or not os.path.isdir(path):
+            continue
+        if _complete_snapshot_id(path) is not None:
+            shutil.rmtree(path, ignore_errors=True)
+    logging.info(f"Snapshot {snapshot_id} is now current: {target}")
+
+
+# ----------------------------
+# Startup
+# ----------------------------
+_startup_done = False
+_startup_lock = threading.Lock()
+
+def load_snapshot_on_startup() -> None:
+    """
+    Import SNAPSHOT_PATH (if present) once per process, before the first store is
+    opened. Failures are logged and the stores are built from the sources instead.
+    """
+    global _startup_done
+    with _startup_lock:
+        if _startup_done:
+            return
+        _startup_done = True
+        if not os.path.exists(SNAPSHOT_PATH):
+            return
+        try:
+            import_snapshot(SNAPSHOT_PATH)
+        except Exception as e:
+            logging.error(f"Could not import vector-store snapshot {SNAPSHOT_PATH}: {e}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tools.snapshot", description="Export or import vector-store snapshots.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="sync every enabled corpus and write a snapshot")
+    export_parser.add_argument("--output", default=SNAPSHOT_PATH)
+    import_parser = commands.add_parser("import", help="restore a snapshot and make it current")
+    import_parser.add_argument("path", nargs="?", default=SNAPSHOT_PATH)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    if args.command == "export":
+        info = export_snapshot(args.output)
+        print(f"{info['snapshot_id']}: {args.output}")
+    else:
+        print(import_snapshot(args.path))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())